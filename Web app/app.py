@@ -14,15 +14,29 @@ On Streamlit Cloud:
       matplotlib>=3.9
       requests>=2.31
   - (optional) runtime.txt: 3.12
+
+Startup: pandas, requests, SimPy and matplotlib are imported on first use, and the
+Streamlit caches are module-level functions, so importing this module (batch jobs,
+benchmarks) loads neither Streamlit nor those libraries.
 """
 
+from __future__ import annotations
+
 import math
-import re
+import sys
 from dataclasses import dataclass
-from typing import List, Tuple, Dict, Optional
+from typing import TYPE_CHECKING, List, Tuple, Dict, Iterable, Optional, Union
+
+if TYPE_CHECKING:
+    import pandas as pd
+    import requests
 
-import pandas as pd
-import requests
+from charts import downsample, render_line_png
+from climate import MONTH_LABELS, ClimateCube, ClimateIndex
+from http_cache import DiskHTTPCache
+from perf import PERF, PERF_TRACE, PERF_TRACE_FILE, Recorder, recording
+from station_parser import align_months, parse_station_lines, station_frame
+from station_store import StationStore
 
 # ---------------- SimPy model (import or fallback) ----------------
 try:
@@ -30,9 +44,8 @@ try:
     MODEL_SOURCE = "external (apple_tree_sim.py)"
 except Exception as e:
     MODEL_SOURCE = f"embedded fallback (reason: {type(e).__name__}: {e})"
-    import simpy
 
-    @dataclass
+    @dataclass(frozen=True)
     class LifecycleParams:
         juvenile_years: int = 10
         exp_start_year: int = 20
@@ -91,7 +104,9 @@ except Exception as e:
                 yield self.env.timeout(1)
                 year += 1
 
-    def simulate(params: LifecycleParams) -> List[Tuple[int, float]]:
+    def simulate(params: LifecycleParams, engine: str = "simpy", cache: bool = False) -> List[Tuple[int, float]]:
+        # engine/cache accepted for signature parity with apple_tree_sim; always SimPy, never cached
+        import simpy
         env = simpy.Environment()
         tree = AppleTree(env, params)
         env.run(until=params.end_year + 1)
@@ -115,17 +130,6 @@ PRESET_STATIONS = {
     "eastbourne": "Eastbourne",
 }
 
-# Regex & helpers
-YEAR_ROW_RE = re.compile(r"^\s*(\d{4})\b")
-LEADING_NUM_RE = re.compile(r"^(-?\d+(?:\.\d+)?)")
-
-# Header hints for context-based labelling
-TMAX_HINTS = ["tmax", "maximum temperature", "mean maximum", "monthly mean maximum", "mean max"]
-TMIN_HINTS = ["tmin", "minimum temperature", "mean minimum", "monthly mean minimum", "mean min"]
-
-JAN_DEC = ["JAN","FEB","MAR","APR","MAY","JUN","JUL","AUG","SEP","OCT","NOV","DEC"]
-NUM_1_12 = [str(i) for i in range(1,13)]
-
 def _ua() -> Dict[str, str]:
     return {"User-Agent": "Mozilla/5.0 (compatible; StreamlitApp/1.0)"}
 
@@ -139,250 +143,192 @@ def _slug_to_url(station_slug_or_url: str) -> str:
         slug = f"{slug}data.txt"
     return BASE_URL + slug
 
-def _download_text(url: str, timeout: int = 30) -> str:
-    r = requests.get(url, timeout=timeout, headers=_ua())
-    r.raise_for_status()
-    return r.text
+# On-disk cache shared by every download (conditional GET, stale copy if offline)
+HTTP_CACHE = DiskHTTPCache()
 
-def _token_to_float(tok: str) -> Optional[float]:
+# Parsed stations, stored as memory-mapped columns and updated month by month
+STATION_STORE = StationStore()
+
+@PERF.timed("download")
+def _download_text(url: str, timeout: int = 30, session: Optional[requests.Session] = None) -> str:
+    return HTTP_CACHE.get_text(url, timeout=timeout, headers=_ua(), session=session)
+
+def _build_tmean_df(text: Union[str, Iterable[Union[str, bytes]]], start_year: int = 1950) -> pd.DataFrame:
     """
-    Convert a monthly token to float:
-      - '---' or '' -> NaN (keeps month position)
-      - '12.3*' / '12.3E' -> 12.3
-      - 'ANN' / 'Provisional...' / non-numeric -> None (stop row)
+    text: the whole file, or any iterable of its lines (str or bytes).
+
+    tmax/tmin are aligned on the integer month index (year * 12 + month - 1) and the
+    frame uses compact dtypes; see station_parser.station_frame.
     """
-    t = tok.strip()
-    if not t or t == "---":
-        return float("nan")
-    tl = t.lower()
-    if tl == "ann" or tl.startswith("provisional"):
-        return None
-    m = LEADING_NUM_RE.match(t)
-    if not m:
-        return None
-    try:
-        return float(m.group(1))
-    except ValueError:
-        return None
-
-# ---------- Wide-table detection (Year with 12 month columns) ----------
-def _is_month_header_line(line: str) -> bool:
-    parts = line.strip().split()
-    if not parts: return False
-    if parts[0].lower() != "year": return False
-    cols = [p.upper() for p in parts[1:]]
-    if len(cols) < 12: return False
-    first12 = cols[:12]
-    return (first12 == JAN_DEC) or (first12 == NUM_1_12)
-
-def _scan_wide_tables(lines: List[str]) -> Dict[int, pd.DataFrame]:
-    """Parse 'wide' monthly tables (Year + 12 month columns)."""
-    tables: Dict[int, pd.DataFrame] = {}
-    i, n = 0, len(lines)
-    while i < n:
-        line = lines[i]
-        if _is_month_header_line(line):
-            rows: List[Tuple[int, int, float]] = []
-            j = i + 1
-            while j < n:
-                L = lines[j].rstrip("\n")
-                if not L.strip(): break
-                if _is_month_header_line(L): break
-                if YEAR_ROW_RE.match(L):
-                    parts = L.split()
-                    try:
-                        year = int(parts[0])
-                    except ValueError:
-                        j += 1; continue
-                    vals: List[float] = []
-                    for tok in parts[1:]:
-                        v = _token_to_float(tok)
-                        if v is None: break
-                        vals.append(v)
-                        if len(vals) == 12: break
-                    if len(vals) == 12:
-                        for m_idx, v in enumerate(vals, start=1):
-                            rows.append((year, m_idx, v))
-                j += 1
-            df = pd.DataFrame(rows, columns=["Year","Month","value"])
-            tables[i] = df
-            i = j; continue
-        i += 1
-    return tables
-
-# ---------- Long-table (row/month) detection: headers with 'mm' ----------
-def _is_mm_header(line: str) -> bool:
-    parts = re.split(r"\s+", line.strip().lower())
-    return ("mm" in parts) and ("year" in parts or "yyyy" in parts or "yr" in parts)
-
-def _parse_mm_table(lines: List[str], hdr_idx: int) -> pd.DataFrame:
-    header = lines[hdr_idx].strip()
-    header_tokens = re.split(r"\s+", header)
-    cols = [c.strip().lower() for c in header_tokens]
-    col_index = {name: idx for idx, name in enumerate(cols)}
-
-    def _find_col_like(names: List[str]) -> Optional[int]:
-        for nm in names:
-            if nm in col_index:
-                return col_index[nm]
-        return None
-
-    year_col = _find_col_like(["year","yyyy","yr"])
-    mm_col   = _find_col_like(["mm","month"])
-    if year_col is None or mm_col is None:
-        return pd.DataFrame(columns=["Year","Month","value","col"])
-
-    # Named tmax/tmin if present
-    tmax_col = _find_col_like(["tmax","tx","tmax(degc)","tmax(c)","maxtemp","tmax_c"])
-    tmin_col = _find_col_like(["tmin","tn","tmin(degc)","tmin(c)","mintemp","tmin_c"])
-
-    rows_all: List[List[Optional[float]]] = []
-    j = hdr_idx + 1
-    while j < len(lines):
-        L = lines[j].rstrip("\n")
-        if not L.strip(): break
-        if _is_mm_header(L) or _is_month_header_line(L): break
-        parts = re.split(r"\s+", L.strip())
-        if len(parts) <= max(year_col, mm_col):
-            j += 1; continue
-        try:
-            year = int(parts[year_col]); mm = int(parts[mm_col])
-        except Exception:
-            j += 1; continue
-        if not (1 <= mm <= 12):
-            j += 1; continue
-
-        row_float: List[Optional[float]] = [None]*len(parts)
-        for idx, tok in enumerate(parts):
-            if idx in (year_col, mm_col): 
-                continue
-            v = _token_to_float(tok)
-            if v is None:  # stop at ANN/provisional marker
-                break
-            row_float[idx] = v
-        rows_all.append([year, mm, row_float, parts])
-        j += 1
-
-    if not rows_all:
-        return pd.DataFrame(columns=["Year","Month","value","col"])
-
-    def _extract_series(col_idx: int, name: str) -> pd.DataFrame:
-        out = []
-        for year, mm, row_float, _ in rows_all:
-            v = row_float[col_idx] if col_idx < len(row_float) else None
-            if v is None: 
-                continue
-            out.append((int(year), int(mm), float(v), name))
-        return pd.DataFrame(out, columns=["Year","Month","value","col"])
-
-    series_frames = []
-    if tmax_col is not None:
-        series_frames.append(_extract_series(tmax_col, "tmax"))
-    if tmin_col is not None:
-        series_frames.append(_extract_series(tmin_col, "tmin"))
-
-    # If missing, infer two best numeric columns (most complete; higher mean → tmax)
-    if len(series_frames) < 2:
-        col_scores: Dict[int, Tuple[int, float]] = {}
-        for _, _, row_float, _ in rows_all:
-            for idx, val in enumerate(row_float):
-                if val is None: 
-                    continue
-                cnt, s = col_scores.get(idx, (0, 0.0))
-                col_scores[idx] = (cnt+1, s+float(val))
-        if col_scores:
-            cand = sorted(col_scores.items(), key=lambda kv: (-kv[1][0], -kv[1][1]))
-            if len(cand) >= 2:
-                idx1, (c1, s1) = cand[0]; idx2, (c2, s2) = cand[1]
-                mean1, mean2 = s1/max(c1,1), s2/max(c2,1)
-                tmax_idx, tmin_idx = (idx1, idx2) if mean1 >= mean2 else (idx2, idx1)
-                series_frames = [
-                    _extract_series(tmax_idx, "tmax"),
-                    _extract_series(tmin_idx, "tmin"),
-                ]
-
-    if not series_frames:
-        return pd.DataFrame(columns=["Year","Month","value","col"])
-
-    return pd.concat(series_frames, ignore_index=True)
-
-def _scan_mm_tables(lines: List[str]) -> Dict[int, pd.DataFrame]:
-    tables: Dict[int, pd.DataFrame] = {}
-    for i, line in enumerate(lines):
-        if _is_mm_header(line):
-            df = _parse_mm_table(lines, i)
-            if not df.empty:
-                tables[i] = df
-    return tables
-
-def _label_from_wide(lines: List[str]) -> Dict[str, pd.DataFrame]:
-    wide = _scan_wide_tables(lines)
-    if not wide: return {}
-    cands = []
-    for _, df in wide.items():
-        if df.empty: continue
-        cands.append((df["value"].mean(skipna=True), df))
-    if len(cands) < 2: 
-        return {}
-    cands.sort(key=lambda x: x[0])
-    return {"tmin": cands[0][1], "tmax": cands[-1][1]}
-
-def _label_from_mm(lines: List[str]) -> Dict[str, pd.DataFrame]:
-    mm_tables = _scan_mm_tables(lines)
-    if not mm_tables:
-        return {}
-    combo = pd.concat(mm_tables.values(), ignore_index=True)
-    if "col" not in combo.columns:
-        return {}
-    out: Dict[str, pd.DataFrame] = {}
-    for var in ("tmax","tmin"):
-        dfv = combo.loc[combo["col"] == var, ["Year","Month","value"]].copy()
-        if not dfv.empty:
-            out[var] = dfv
-    return out
-
-def _build_tmean_df(text: str, start_year: int = 1950) -> pd.DataFrame:
-    lines = text.splitlines()
-
-    labeled = _label_from_mm(lines)
-    if "tmax" not in labeled or "tmin" not in labeled:
-        fallback = _label_from_wide(lines)
-        for k, v in fallback.items():
-            labeled.setdefault(k, v)
+    lines = text.splitlines() if isinstance(text, str) else text
+
+    labeled = parse_station_lines(lines)
 
     if "tmax" not in labeled or "tmin" not in labeled:
         raise ValueError("Could not obtain both tmax and tmin from file (mm/wide formats).")
 
-    df_tmax = labeled["tmax"].rename(columns={"value": "tmax"})
-    df_tmin = labeled["tmin"].rename(columns={"value": "tmin"})
+    with PERF.span("build.merge"):
+        month_index, tmax, tmin = align_months(labeled)
+        df = station_frame(month_index, tmax, tmin, start_year=start_year)
+    PERF.count("build.rows", len(df))
+    return df
+
+# ---------------- Bulk loading: many stations concurrently ----------------
+def _make_session(pool_size: int = 8, retries: int = 3, backoff: float = 0.5) -> requests.Session:
+    """Pooled keep-alive session; retries connection errors and 429/5xx with exponential backoff."""
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    retry = Retry(
+        total=retries, connect=retries, read=retries, backoff_factor=backoff,
+        status_forcelist=(429, 500, 502, 503, 504), allowed_methods=frozenset({"GET"}),
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.headers.update(_ua())
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def load_stations(
+    stations: Iterable[str],
+    start_year: int = 1950,
+    max_workers: int = 8,
+    timeout: int = 30,
+    retries: int = 3,
+    session: Optional[requests.Session] = None,
+) -> Iterable[Tuple[str, Optional[pd.DataFrame], Optional[Exception]]]:
+    """
+    Fetch and parse many stations (preset slugs or .txt URLs) concurrently.
 
-    for df in (df_tmax, df_tmin):
-        if "Month" not in df.columns and "mm" in df.columns:
-            df.rename(columns={"mm":"Month"}, inplace=True)
+    Up to `max_workers` downloads run at once over one pooled session; each worker
+    parses its body as soon as it has arrived, so parsing overlaps the remaining
+    downloads. Yields (station, df, None) or (station, None, error) in completion order;
+    a failing station does not stop the others.
+    """
+    import contextvars
+    from concurrent.futures import ThreadPoolExecutor, as_completed
 
-    df = pd.merge(df_tmax, df_tmin, on=["Year","Month"], how="inner")
-    df = df.loc[df["Year"] >= int(start_year)].copy()
-    if df.empty:
-        raise ValueError(f"No monthly records at or after start_year={start_year}.")
+    stations = list(dict.fromkeys(s.strip() for s in stations if s.strip()))
+    own_session = session is None
+    session = session or _make_session(pool_size=max_workers, retries=retries)
 
-    df["tmean"] = (df["tmax"] + df["tmin"]) / 2.0
-    df["Date"] = pd.to_datetime(df[["Year","Month"]].assign(DAY=1)) + pd.offsets.MonthEnd(0)
-    return df.sort_values(["Year","Month"]).reset_index(drop=True)
+    def _one(station: str) -> pd.DataFrame:
+        text = _download_text(_slug_to_url(station), timeout=timeout, session=session)
+        return _build_tmean_df(text, start_year=start_year)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            # Each worker runs in a copy of this context, so its spans reach this rerun's recorder
+            futures = {pool.submit(contextvars.copy_context().run, _one, station): station for station in stations}
+            for fut in as_completed(futures):
+                try:
+                    yield futures[fut], fut.result(), None
+                except Exception as ex:
+                    yield futures[fut], None, ex
+    finally:
+        if own_session:
+            session.close()
+
+# ---------------- Cached loaders (module level: defined once, stable cache keys) ----------------
+def _st_cache(kind: str, **kwargs):
+    """
+    st.cache_data / st.cache_resource when Streamlit is already loaded (`streamlit run`);
+    a no-op otherwise, so importing this module never imports Streamlit.
+    """
+    st = sys.modules.get("streamlit")
+    if st is None:
+        return lambda fn: fn
+    return getattr(st, kind)(**kwargs)
+
+CACHE_TTL = 60 * 60 * 24
+
+@_st_cache("cache_resource", show_spinner=False)
+def get_http_session() -> requests.Session:
+    """One pooled keep-alive session shared by every rerun and browser session."""
+    return _make_session()
+
+# Cache per (station, start_year)
+@_st_cache("cache_data", show_spinner=False, ttl=CACHE_TTL)
+def get_station_df(station_slug_or_url: str, start_year: int) -> pd.DataFrame:
+    PERF.count("station.cache_misses")
+    url = _slug_to_url(station_slug_or_url)
+    text = _download_text(url, session=get_http_session())
+    # Only months newer than the stored ones are parsed; the frame is read from memory maps
+    try:
+        STATION_STORE.update(url, text)
+        return STATION_STORE.frame(url, start_year=start_year)
+    except OSError:
+        # Read-only, full or otherwise unusable store directory: parse the text directly
+        PERF.count("store.unavailable")
+        return _build_tmean_df(text, start_year=start_year)
+
+# Per-month prefix sums, built once per loaded station (year-range queries are O(12));
+# read-only, so shared as a resource instead of being unpickled on every rerun
+@_st_cache("cache_resource", show_spinner=False, ttl=CACHE_TTL)
+def get_station_index(station_slug_or_url: str, start_year: int) -> ClimateIndex:
+    return ClimateIndex.from_frame(get_station_df(station_slug_or_url, start_year))
+
+# All presets packed into one station x year x month cube (loaded concurrently), plus
+# the presets that failed to load (station name -> error), which the UI reports
+@_st_cache("cache_resource", show_spinner="Loading preset stations…", ttl=CACHE_TTL)
+def get_preset_cube(start_year: int) -> Tuple[ClimateCube, Dict[str, str]]:
+    loaded: Dict[str, pd.DataFrame] = {}
+    failed: Dict[str, str] = {}
+    for slug, df, error in load_stations(PRESET_STATIONS, start_year=start_year, session=get_http_session()):
+        if error is None:
+            loaded[slug] = df
+        else:
+            failed[PRESET_STATIONS[slug]] = f"{type(error).__name__}: {error}"
+    if not loaded:
+        raise RuntimeError("No preset station could be loaded: " + "; ".join(f"{k} ({v})" for k, v in failed.items()))
+    cube = ClimateCube.from_frames((PRESET_STATIONS[slug], loaded.get(slug)) for slug in PRESET_STATIONS)
+    return cube, failed
 
 # ---------------- Streamlit UI ----------------
+def _perf_panel(st, rec: Recorder) -> None:
+    """Sidebar breakdown of the spans and counters recorded during this rerun."""
+    import pandas as pd
+    with st.sidebar.expander("Performance", expanded=True):
+        summary = rec.summary()
+        if summary:
+            st.dataframe(
+                pd.DataFrame(summary).set_index("name").round(2),
+                use_container_width=True
+            )
+        else:
+            st.caption("No spans recorded.")
+        if rec.counters:
+            st.dataframe(
+                pd.Series(dict(rec.counters), name="value").rename_axis("counter").to_frame(),
+                use_container_width=True
+            )
+        st.download_button(
+            "Export JSON lines", rec.to_jsonl(), file_name=f"perf-{rec.run_id}.jsonl", mime="application/json"
+        )
+
 def main():
     import streamlit as st
-    try:
-        import matplotlib.pyplot as plt
-        HAS_MPL = True
-    except ModuleNotFoundError:
-        plt = None
-        HAS_MPL = False
-
     st.set_page_config(page_title="Apple Tree Lifecycle & UK Stations", layout="wide")
     st.title("🍎 Apple Tree Lifecycle & 🌡️ UK Station Climate")
     st.caption(f"Model source: {MODEL_SOURCE}")
 
+    # The toggle's state is per session; each rerun records into its own Recorder
+    show_perf = st.sidebar.toggle("Performance panel", value=PERF_TRACE, key="perf_panel")
+    with recording(enabled=show_perf) as rec:
+        try:
+            with PERF.span("rerun"):
+                _render(st)
+        finally:
+            if show_perf:
+                if PERF_TRACE_FILE:
+                    rec.export(PERF_TRACE_FILE)
+                _perf_panel(st, rec)
+
+def _render(st):
+    import pandas as pd
+
     tab_model, tab_station = st.tabs(["Lifecycle model", "Station temps"])
 
     # ---------- Tab 1: lifecycle model ----------
@@ -428,7 +374,7 @@ Use the sliders to change lifecycle phase boundaries and plateau yield.
             slow_max_fraction=float(slow_max_fraction),
             decline_fraction=float(decline_fraction),
         )
-        data = simulate(params)
+        data = simulate(params, cache=True)
         df = pd.DataFrame(data, columns=["Year", "Yield (kg)"])
 
         c1, c2, c3 = st.columns(3)
@@ -436,16 +382,18 @@ Use the sliders to change lifecycle phase boundaries and plateau yield.
         c2.metric("Total yield (kg)", f"{df['Yield (kg)'].sum():.0f}")
         c3.metric("Productive years", f"{int((df['Yield (kg)'] > 0).sum())}")
 
-        if HAS_MPL:
-            fig, ax = plt.subplots()
-            ax.plot(df["Year"], df["Yield (kg)"], linewidth=2)
-            ax.set_xlabel("Year"); ax.set_ylabel("Yield (kg)"); ax.set_title("Apple Tree Annual Yield")
-            ax.grid(True, linestyle="--", alpha=0.4)
-            st.pyplot(fig, clear_figure=True)
-        else:
-            st.line_chart(df.set_index("Year")["Yield (kg)"])
+        with PERF.span("render.lifecycle_chart"):
+            png = render_line_png(
+                df["Year"].to_numpy(), df["Yield (kg)"].to_numpy(),
+                title="Apple Tree Annual Yield", xlabel="Year", ylabel="Yield (kg)", linewidth=2, grid_alpha=0.4,
+            )
+            if png is not None:
+                st.image(png)
+            else:
+                st.line_chart(df.set_index("Year")["Yield (kg)"])
 
-        st.dataframe(df, use_container_width=True)
+        with PERF.span("render.dataframe", rows=len(df)):
+            st.dataframe(df, use_container_width=True)
 
     # ---------- Tab 2: Station temps ----------
     with tab_station:
@@ -475,16 +423,11 @@ Use the sliders to change lifecycle phase boundaries and plateau yield.
         # Start year filter
         start_year = st.number_input("Start year", min_value=1850, max_value=2100, value=1950, step=1)
 
-        # Cache per (station, start_year)
-        @st.cache_data(show_spinner=False, ttl=60*60*24)
-        def get_station_df(station_slug_or_url_cached: str, start_year_cached: int) -> pd.DataFrame:
-            url = _slug_to_url(station_slug_or_url_cached)
-            text = _download_text(url)
-            return _build_tmean_df(text, start_year=start_year_cached)
-
         # Load & plot
         try:
-            dfm = get_station_df(station_slug_or_url, int(start_year))
+            with PERF.span("station.load"):
+                dfm = get_station_df(station_slug_or_url, int(start_year))
+                station_index = get_station_index(station_slug_or_url, int(start_year))
         except Exception as ex:
             st.error(
                 f"Could not load data for **{station_label}**.\n\nError: {ex}"
@@ -492,7 +435,7 @@ Use the sliders to change lifecycle phase boundaries and plateau yield.
             if st.toggle("Show first 160 lines of raw file (debug)"):
                 try:
                     url = _slug_to_url(station_slug_or_url)
-                    raw = _download_text(url)
+                    raw = _download_text(url, session=get_http_session())
                     st.code("\n".join(raw.splitlines()[:160]))
                 except Exception as ex2:
                     st.write(f"(Re-download failed: {ex2})")
@@ -504,41 +447,70 @@ Use the sliders to change lifecycle phase boundaries and plateau yield.
             min_value=min_year, max_value=max_year,
             value=(max(min_year, max_year - 30), max_year), step=1
         )
-        df_sel = dfm.query("@yr0 <= Year <= @yr1").copy()
-
-        try:
-            import matplotlib.pyplot as plt
-            fig2, ax2 = plt.subplots()
-            ax2.plot(df_sel["Date"], df_sel["tmean"], linewidth=1.7)
-            ax2.set_xlabel("Date"); ax2.set_ylabel("Mean temperature (°C)")
-            ax2.set_title(f"{station_label}: monthly mean temperature — {yr0} to {yr1}")
-            ax2.grid(True, linestyle="--", alpha=0.35)
-            st.pyplot(fig2, clear_figure=True)
-        except Exception:
-            st.line_chart(df_sel.set_index("Date")["tmean"])
+        # Frame is sorted by Year: slice the selected rows instead of query + copy
+        lo, hi = dfm["Year"].searchsorted([yr0, yr1 + 1])
+        df_sel = dfm.iloc[lo:hi]
+
+        with PERF.span("render.station_chart", points=len(df_sel)):
+            dates, tmean = df_sel["Date"].to_numpy(), df_sel["tmean"].to_numpy()
+            png = render_line_png(
+                dates, tmean,
+                title=f"{station_label}: monthly mean temperature — {yr0} to {yr1}",
+                xlabel="Date", ylabel="Mean temperature (°C)",
+            )
+            if png is not None:
+                st.image(png)
+            else:
+                dates, tmean = downsample(dates, tmean)
+                st.line_chart(pd.DataFrame({"tmean": tmean}, index=pd.Index(dates, name="Date")))
 
         with st.expander("Monthly climatology over selected years"):
-            clim = (
-                df_sel.assign(mon=lambda d: d["Date"].dt.month)
-                      .groupby("mon")["tmean"].mean()
-                      .reindex(range(1, 13))
-            )
-            clim.index = pd.Index(
-                ["Jan","Feb","Mar","Apr","May","Jun","Jul","Aug","Sep","Oct","Nov","Dec"], name="Month"
+            clim = pd.Series(
+                station_index.climatology(yr0, yr1), index=pd.Index(MONTH_LABELS, name="Month"), name="tmean"
             )
+            st.caption(f"Mean over {yr0}–{yr1}: {station_index.range_mean(yr0, yr1):.2f} °C")
             st.bar_chart(clim)
 
-        st.dataframe(
-            df_sel[["Year", "Month", "tmax", "tmin", "tmean", "Date"]],
-            use_container_width=True
-        )
+        with PERF.span("render.dataframe", rows=len(df_sel)):
+            st.dataframe(
+                df_sel[["Year", "Month", "tmax", "tmin", "tmean", "Date"]],
+                use_container_width=True
+            )
+
+        if st.toggle("Compare all preset stations"):
+            try:
+                cube, failed = get_preset_cube(int(start_year))
+            except Exception as ex:
+                st.error(f"Could not load preset stations.\n\nError: {ex}")
+                return
+            if failed:
+                st.warning(
+                    f"{len(failed)} preset station(s) could not be loaded and are missing from the table:\n\n"
+                    + "\n".join(f"- {name}: {error}" for name, error in failed.items())
+                )
+                # The result is cached; let the user try the failed stations again
+                if st.button("Retry loading preset stations"):
+                    get_preset_cube.clear()
+                    st.rerun()
+            st.dataframe(
+                pd.DataFrame({
+                    f"Mean {yr0}–{yr1} (°C)": cube.range_means(yr0, yr1),
+                    "Rank (1 = warmest)": cube.rank_stations(yr0, yr1),
+                    "Trend (°C/decade)": cube.trend(yr0, yr1),
+                    "Coverage": cube.coverage(yr0, yr1),
+                }, index=pd.Index(cube.stations, name="Station")).round(3),
+                use_container_width=True
+            )
 
 # --------- Only run UI when Streamlit provides a ScriptRunContext ---------
-try:
-    from streamlit.runtime.scriptrunner import get_script_run_ctx
-    _HAS_CTX = get_script_run_ctx() is not None
-except Exception:
-    _HAS_CTX = False
+# `streamlit run` has already imported Streamlit; a plain import of this module must not
+_HAS_CTX = False
+if "streamlit" in sys.modules:
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        _HAS_CTX = get_script_run_ctx() is not None
+    except Exception:
+        pass
 
 if _HAS_CTX:
     import streamlit as st  # noqa
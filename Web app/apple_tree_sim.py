@@ -11,13 +11,18 @@ Phases (default):
 All phase boundaries and key magnitudes are parameterized so a UI (Streamlit) can adjust them.
 """
 
-from dataclasses import dataclass
-from typing import List, Tuple
-import simpy
+from dataclasses import dataclass, fields
+from functools import lru_cache
+from typing import TYPE_CHECKING, List, Optional, Sequence, Tuple, Union
 import math
+import numpy as np
 
+# SimPy is only needed by the "simpy"/"phases" engines; it is imported on first use
+if TYPE_CHECKING:
+    import simpy
 
-@dataclass
+
+@dataclass(frozen=True, slots=True)
 class LifecycleParams:
     juvenile_years: int = 10           # end of slow growth
     exp_start_year: int = 20           # start exponential growth
@@ -112,10 +117,211 @@ def yield_at_year(year: int, p: LifecycleParams) -> float:
     return 0.0
 
 
+def _yield_curve_arrays(
+    years,
+    juvenile_years,
+    exp_start_year,
+    plateau_start_year,
+    decline_start_year,
+    end_year,
+    plateau_yield,
+    slow_max_fraction,
+    decline_fraction,
+) -> np.ndarray:
+    """
+    Vectorized core of `yield_at_year`.
+
+    Every argument may be a scalar or an array; they are broadcast together, so the
+    same code evaluates one tree over many years, or many trees (one parameter set
+    per element) over a shared year axis. Phases are selected with masks in the same
+    order as the `if` chain in `yield_at_year`.
+    """
+    t = np.asarray(years, dtype=np.float64)
+    juv = np.asarray(juvenile_years, dtype=np.float64)
+    t_exp = np.asarray(exp_start_year, dtype=np.float64)
+    t_plat = np.asarray(plateau_start_year, dtype=np.float64)
+    t_dec = np.asarray(decline_start_year, dtype=np.float64)
+    t_end = np.asarray(end_year, dtype=np.float64)
+
+    plateau = np.asarray(plateau_yield, dtype=np.float64)
+    slow_target = np.asarray(slow_max_fraction, dtype=np.float64) * plateau
+    decline_floor = (1.0 - np.asarray(decline_fraction, dtype=np.float64)) * plateau
+
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        # Slow phase: quadratic ramp
+        f = (t / np.maximum(juv, 1.0)) ** 2
+        slow = f * slow_target
+
+        # Exponential bridge (see `_exp_bridge`); k is computed once per parameter set
+        y0 = np.where(slow_target <= 0, 1e-6, slow_target)
+        k = np.log(plateau / y0) / (t_plat - t_exp)
+        bridge = np.where(plateau <= 0, 0.0, y0 * np.exp(k * (t - t_exp)))
+
+        # Decline: map [decline_start_year, end_year-1] -> [plateau, decline_floor]
+        span = np.maximum((t_end - 1) - t_dec, 1.0)
+        alpha = np.clip((t - t_dec) / span, 0.0, 1.0)
+        decline = (1 - alpha) * plateau + alpha * decline_floor
+
+    out = np.select(
+        [
+            (t < 0) | (t >= t_end),
+            t < juv,
+            t < t_exp,
+            t < t_plat,
+            t < t_dec,
+        ],
+        [0.0, slow, slow_target, bridge, plateau],
+        default=decline,
+    )
+    return out.astype(np.float64, copy=False)
+
+
+def _params_columns(params: Sequence[LifecycleParams]) -> List[np.ndarray]:
+    """Stack a sequence of LifecycleParams into one (n, 1) column per field."""
+    return [
+        np.array([getattr(p, f.name) for p in params], dtype=np.float64)[:, None]
+        for f in fields(LifecycleParams)
+    ]
+
+
+def yield_curve(years, p: Union[LifecycleParams, Sequence[LifecycleParams]]) -> np.ndarray:
+    """
+    Vectorized `yield_at_year`: evaluate the whole lifecycle for an array of years.
+
+    - p is a LifecycleParams: returns a float64 array with the same shape as `years`.
+    - p is a sequence of LifecycleParams: returns an (n_params, n_years) array, one
+      curve per row, computed in a single broadcast pass.
+
+    Values agree with `yield_at_year` to floating-point rounding (NumPy's exp/log may
+    differ from the `math` module in the last ulp).
+    """
+    if isinstance(p, LifecycleParams):
+        return _yield_curve_arrays(
+            years,
+            p.juvenile_years,
+            p.exp_start_year,
+            p.plateau_start_year,
+            p.decline_start_year,
+            p.end_year,
+            p.plateau_yield,
+            p.slow_max_fraction,
+            p.decline_fraction,
+        )
+    years = np.asarray(years, dtype=np.float64).reshape(1, -1)
+    return _yield_curve_arrays(years, *_params_columns(p))
+
+
+@dataclass
+class LifecycleSummary:
+    peak_yield: Union[float, np.ndarray]        # max annual yield over the history
+    total_yield: Union[float, np.ndarray]       # sum of annual yields
+    productive_years: Union[int, np.ndarray]    # number of years with yield > 0
+
+
+def _summary_arrays(
+    juvenile_years,
+    exp_start_year,
+    plateau_start_year,
+    decline_start_year,
+    end_year,
+    plateau_yield,
+    slow_max_fraction,
+    decline_fraction,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Closed-form peak / total / productive years of the history from `simulate`.
+
+    Year t falls in a phase when it passes every earlier boundary and is below the
+    phase's own (the `if` chain in `yield_at_year`), so each phase covers the integer
+    years [lo, hi). Sums per phase:
+    - slow: quadratic ramp -> sum of squares
+    - quiet, plateau: constant * count
+    - exponential: geometric series
+    - decline: arithmetic series
+    Every phase is monotonic, so the peak is attained at a phase endpoint.
+    """
+    J, E, P, D, N = (np.asarray(b, dtype=np.float64) for b in (
+        juvenile_years, exp_start_year, plateau_start_year, decline_start_year, end_year))
+    plateau = np.asarray(plateau_yield, dtype=np.float64)
+    slow_target = np.asarray(slow_max_fraction, dtype=np.float64) * plateau
+    decline_fraction = np.asarray(decline_fraction, dtype=np.float64)
+    zero = np.zeros(np.broadcast(J, E, P, D, N, plateau, slow_target, decline_fraction).shape)
+
+    def _span(lo, hi):
+        return lo, np.maximum(hi - lo, 0.0)
+
+    lo_s, n_s = _span(zero, np.minimum(J, N))
+    lo_q, n_q = _span(np.maximum(zero, J), np.minimum(E, N))
+    lo_e, n_e = _span(np.maximum.reduce([zero, J, E]), np.minimum(P, N))
+    lo_p, n_p = _span(np.maximum.reduce([zero, J, E, P]), np.minimum(D, N))
+    lo_d, n_d = _span(np.maximum.reduce([zero, J, E, P, D]), N)
+
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        # Slow: sum_{t<n} (t/m)^2 * s
+        m2 = np.maximum(J, 1.0) ** 2
+        last = n_s - 1
+        slow_sum = slow_target / m2 * (last * (last + 1) * (2 * last + 1) / 6)
+        slow_ends = [zero, slow_target * last ** 2 / m2]
+
+        # Exponential: y0 * r^(t - E) for t in [lo, lo + n), r = exp(k)
+        y0 = np.where(slow_target <= 0, 1e-6, slow_target)
+        k = np.log(plateau / y0) / (P - E)
+        first_e = y0 * np.exp(k * (lo_e - E))
+        ratio_sum = np.where(k == 0, n_e, np.expm1(k * n_e) / np.expm1(k))
+        exp_on = (n_e > 0) & (plateau > 0)
+        exp_sum = np.where(exp_on, first_e * ratio_sum, 0.0)
+        exp_ends = [np.where(exp_on, first_e, 0.0), np.where(exp_on, y0 * np.exp(k * (lo_e + n_e - 1 - E)), 0.0)]
+
+        # Decline: plateau - slope * (t - D), linear in t
+        slope = decline_fraction * plateau / np.maximum((N - 1) - D, 1.0)
+        off = lo_d - D
+        dec_sum = n_d * plateau - slope * (n_d * off + n_d * (n_d - 1) / 2)
+        dec_ends = [plateau - slope * off, plateau - slope * (off + n_d - 1)]
+
+        # Years with yield > 0 in the decline: solve plateau - slope * (t - D) > 0
+        cross = D + plateau / slope
+        dec_pos = np.select(
+            [slope > 0, slope < 0],
+            [np.minimum(N, np.ceil(cross)) - lo_d, N - np.maximum(lo_d, np.floor(cross) + 1)],
+            default=np.where(plateau > 0, n_d, 0.0),
+        )
+        dec_pos = np.clip(np.nan_to_num(dec_pos), 0.0, n_d)
+
+    total = slow_sum + n_q * slow_target + exp_sum + n_p * plateau + dec_sum
+
+    candidates = [zero]  # year end_year (removal) is always recorded as 0
+    for n, ends in ((n_s, slow_ends), (n_q, [slow_target]), (n_e, exp_ends), (n_p, [plateau]), (n_d, dec_ends)):
+        candidates += [np.where(n > 0, v, -np.inf) for v in ends]
+    peak = np.maximum.reduce(candidates)
+
+    productive = (
+        np.where(slow_target > 0, np.maximum(n_s - 1, 0.0), 0.0)   # t = 0 yields 0
+        + np.where(slow_target > 0, n_q, 0.0)
+        + np.where(plateau > 0, n_e + n_p, 0.0)
+        + dec_pos
+    )
+    return peak, total, productive.astype(np.int64)
+
+
+def lifecycle_summary(p: Union[LifecycleParams, Sequence[LifecycleParams]]) -> LifecycleSummary:
+    """
+    Peak yield, total yield and productive years of `simulate(p)` in O(number of phases),
+    without evaluating any year.
+
+    - p is a LifecycleParams: fields are Python scalars.
+    - p is a sequence of LifecycleParams: fields are arrays, one entry per parameter set.
+    """
+    if isinstance(p, LifecycleParams):
+        peak, total, productive = _summary_arrays(*(getattr(p, f.name) for f in fields(LifecycleParams)))
+        return LifecycleSummary(float(peak), float(total), int(productive))
+    peak, total, productive = _summary_arrays(*(c[:, 0] for c in _params_columns(p)))
+    return LifecycleSummary(peak, total, productive)
+
+
 class AppleTree:
     """Represents one apple tree in the SimPy environment."""
 
-    def __init__(self, env: simpy.Environment, params: LifecycleParams):
+    def __init__(self, env: "simpy.Environment", params: LifecycleParams):
         self.env = env
         self.params = params
         self.history: List[Tuple[int, float]] = []  # (year, yield)
@@ -132,15 +338,479 @@ class AppleTree:
             year += 1
 
 
-def simulate(params: LifecycleParams) -> List[Tuple[int, float]]:
-    """Run a single-tree simulation and return (year, yield) pairs."""
+SIM_ENGINES = ("direct", "simpy", "phases")
+
+# ---------------- Memoized histories ----------------
+# LifecycleParams is frozen and hashable, so a history can be cached per parameter set.
+# Entries are read-only float64 arrays of yields for years 0..end_year.
+HISTORY_CACHE_SIZE = 256
+
+
+def _compute_history(params: LifecycleParams) -> np.ndarray:
+    arr = np.array([yield_at_year(year, params) for year in range(params.end_year + 1)], dtype=np.float64)
+    arr.flags.writeable = False
+    return arr
+
+
+_history_cache = lru_cache(maxsize=HISTORY_CACHE_SIZE)(_compute_history)
+
+
+def cached_history(params: LifecycleParams) -> np.ndarray:
+    """
+    Memoized yields for years 0..end_year (identical to the values from `simulate`,
+    i.e. the memoized counterpart of `yield_curve(np.arange(end_year + 1), params)`).
+    The returned array is shared between callers and read-only.
+    """
+    return _history_cache(params)
+
+
+def history_cache_info():
+    """(hits, misses, maxsize, currsize) of the history cache."""
+    return _history_cache.cache_info()
+
+
+def set_history_cache_size(maxsize: Optional[int]) -> None:
+    """Resize the history cache (None = unbounded, 0 = disabled). Clears current entries."""
+    global _history_cache
+    _history_cache = lru_cache(maxsize=maxsize)(_compute_history)
+
+
+def clear_history_cache() -> None:
+    _history_cache.cache_clear()
+
+
+class SimulationResult:
+    """
+    Array-backed (year, yield) history.
+
+    Years and yields live in two preallocated arrays (int16 years unless the horizon
+    needs more; float64 or float32 yields). Iterating, indexing and len() behave like
+    the list of (year, yield) tuples returned by `simulate`, slicing returns views, and
+    `to_numpy` / `to_pandas` expose the arrays without copying them.
+    """
+
+    __slots__ = ("years", "yields")
+
+    def __init__(self, years: np.ndarray, yields: np.ndarray):
+        self.years = years
+        self.yields = yields
+
+    @staticmethod
+    def year_axis(n: int) -> np.ndarray:
+        """Years 0..n-1 in the smallest integer dtype that holds them."""
+        return np.arange(n, dtype=np.int16 if n <= np.iinfo(np.int16).max else np.int32)
+
+    def __len__(self) -> int:
+        return self.years.size
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return SimulationResult(self.years[i], self.yields[i])
+        return int(self.years[i]), float(self.yields[i])
+
+    def __iter__(self):
+        return zip(self.years.tolist(), self.yields.tolist())
+
+    def __repr__(self) -> str:
+        return f"SimulationResult(n={len(self)}, yields={self.yields.dtype})"
+
+    def tolist(self) -> List[Tuple[int, float]]:
+        return list(self)
+
+    def to_numpy(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(years, yields) — the underlying arrays, not copies."""
+        return self.years, self.yields
+
+    def to_pandas(self, columns: Tuple[str, str] = ("Year", "Yield (kg)")):
+        import pandas as pd
+        return pd.DataFrame({columns[0]: self.years, columns[1]: self.yields}, copy=False)
+
+
+# ---------------- Sub-annual time steps ----------------
+# A year is 12 months or 365 days (no leap days), so (year, step) reshapes cleanly.
+TIME_STEPS = {"annual": 1, "monthly": 12, "daily": 365}
+MONTH_DAYS = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+# Share of the annual yield harvested in each month (Aug..Oct for UK dessert apples)
+HARVEST_MONTHLY = (0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.15, 0.50, 0.35, 0.0, 0.0)
+
+
+def harvest_profile(step: str = "monthly", monthly: Sequence[float] = HARVEST_MONTHLY) -> np.ndarray:
+    """
+    Fraction of a year's yield falling in each step of the year (sums to 1).
+    Daily weights spread each month's share evenly over its days.
+    """
+    if step not in TIME_STEPS:
+        raise ValueError(f"Unknown step {step!r}; expected one of {tuple(TIME_STEPS)}.")
+    w = np.asarray(monthly, dtype=np.float64)
+    w = w / w.sum()
+    if step == "annual":
+        return np.ones(1)
+    if step == "monthly":
+        return w
+    return np.repeat(w / np.asarray(MONTH_DAYS), MONTH_DAYS)
+
+
+def distribute_yields(annual, step: str = "monthly", profile: Optional[np.ndarray] = None, dtype=np.float32) -> np.ndarray:
+    """
+    Spread annual yields (..., n_years) over the year: returns (..., n_years, steps).
+    `result.sum(axis=-1)` gives the annual totals back; `result.reshape(*lead, -1)` is
+    the flat time series (a view).
+    """
+    profile = harvest_profile(step) if profile is None else np.asarray(profile, dtype=np.float64)
+    annual = np.asarray(annual)
+    out = np.empty(annual.shape + (profile.size,), dtype=dtype)
+    np.multiply(annual[..., None], profile.astype(dtype), out=out, casting="unsafe")
+    return out
+
+
+class SeasonalResult:
+    """Sub-annual history: `yields[i, k]` is step k of year `years[i]`."""
+
+    __slots__ = ("years", "yields", "step")
+
+    def __init__(self, years: np.ndarray, yields: np.ndarray, step: str):
+        self.years = years
+        self.yields = yields
+        self.step = step
+
+    def __len__(self) -> int:
+        return self.yields.size
+
+    def __repr__(self) -> str:
+        return f"SeasonalResult(years={len(self.years)}, step={self.step!r}, yields={self.yields.dtype})"
+
+    def flat(self) -> np.ndarray:
+        """Time series over all steps (a view)."""
+        return self.yields.reshape(-1)
+
+    def annual(self) -> np.ndarray:
+        """Annual totals (float64 accumulation)."""
+        return self.yields.sum(axis=-1, dtype=np.float64)
+
+    def to_pandas(self, column: str = "Yield (kg)"):
+        import pandas as pd
+        steps = self.yields.shape[1]
+        return pd.DataFrame({
+            "Year": np.repeat(self.years, steps),
+            "Step": np.tile(np.arange(1, steps + 1, dtype=np.int16), len(self.years)),
+            column: self.flat(),
+        })
+
+
+def simulate(
+    params: LifecycleParams,
+    engine: str = "direct",
+    cache: bool = False,
+    compact: bool = False,
+    dtype=np.float64,
+    step: str = "annual",
+    profile: Optional[np.ndarray] = None,
+) -> Union[List[Tuple[int, float]], SimulationResult, SeasonalResult]:
+    """
+    Run a single-tree simulation and return (year, yield) pairs.
+
+    engine:
+    - "direct": evaluate yield_at_year for years 0..end_year without an event loop
+      (the history depends only on params, so this is the default)
+    - "simpy": step an AppleTree process one year at a time in a simpy.Environment
+      (for models that add events on top)
+    - "phases": a PhaseTree process in a simpy.Environment that wakes only at phase
+      boundaries and fills the years in between from the precomputed history
+
+    All engines return identical histories. With cache=True the "direct" history, and
+    the history a "phases" tree fills in from, are served from the LRU cache (see
+    `cached_history`); with cache=False neither engine reads or fills that cache.
+    With compact=True the history is returned as a SimulationResult with `dtype`
+    yields instead of a list of tuples.
+
+    step "monthly" or "daily" returns a SeasonalResult whose (n_years, steps) `dtype`
+    array spreads each year's yield by `profile` (default: `harvest_profile(step)`).
+    """
+    if engine not in SIM_ENGINES:
+        raise ValueError(f"Unknown engine {engine!r}; expected one of {SIM_ENGINES}.")
+    n = params.end_year + 1
+
+    if step != "annual":
+        annual = simulate(params, engine=engine, cache=cache, compact=True)
+        profile = harvest_profile(step) if profile is None else profile
+        return SeasonalResult(annual.years, distribute_yields(annual.yields, step, profile, dtype=dtype), step)
+
+    if engine == "direct" and cache:
+        yields = cached_history(params)
+        if compact:
+            # float64 results share the cached read-only array
+            return SimulationResult(SimulationResult.year_axis(n), yields.astype(dtype, copy=False))
+        return list(enumerate(yields.tolist()))
+
+    if engine == "direct":
+        if compact:
+            yields = np.fromiter((yield_at_year(year, params) for year in range(n)), dtype=dtype, count=n)
+            return SimulationResult(SimulationResult.year_axis(n), yields)
+        return [(year, yield_at_year(year, params)) for year in range(n)]
+
+    import simpy
     env = simpy.Environment()
+    if engine == "phases":
+        tree = PhaseTree(env, params, base=None if cache else _compute_history(params))
+        env.run()
+        if compact:
+            return SimulationResult(SimulationResult.year_axis(n), tree.yields.astype(dtype))
+        return list(enumerate(tree.yields.tolist()))
+
     tree = AppleTree(env, params)
-    env.run(until=params.end_year + 1)
+    env.run(until=n)
+    if compact:
+        yields = np.fromiter((y for _, y in tree.history), dtype=dtype, count=len(tree.history))
+        return SimulationResult(SimulationResult.year_axis(len(yields)), yields)
     return tree.history
 
 
+@dataclass(frozen=True)
+class TreeEvent:
+    kind: str           # "frost" | "prune" | "replant"
+    factor: float = 1.0 # yield multiplier (frost, prune)
+    years: int = 1      # number of years the multiplier applies from the event year
+
+
+TREE_EVENT_KINDS = ("frost", "prune", "replant")
+
+
+class PhaseTree:
+    """
+    Event-skipping apple tree for SimPy models.
+
+    Unlike AppleTree, which wakes every year, the process only times out at the next
+    phase boundary (juvenile end, exponential start, plateau, decline, removal) and
+    at the end of the horizon, so a tree costs O(phases) scheduler events. The years
+    in between are filled analytically from `base`, the yields by age 0..end_year
+    (default: `cached_history(params)`; pass an uncached array to keep the shared
+    history cache out of it).
+
+    External events (TreeEvent) arrive through `apply()`, which interrupts the
+    process at the current time:
+    - frost / prune: multiply the yield of the next `years` years (from now) by `factor`
+    - replant: the tree is replaced by a new one of age 0 now
+
+    `yields[t]` is the yield in simulation year t, for t in [0, horizon); the default
+    horizon (end_year + 1) matches the years recorded by AppleTree.
+    """
+
+    def __init__(
+        self,
+        env: "simpy.Environment",
+        params: LifecycleParams,
+        horizon: Optional[int] = None,
+        base: Optional[np.ndarray] = None,
+    ):
+        self.env = env
+        self.params = params
+        self.horizon = params.end_year + 1 if horizon is None else int(horizon)
+        self.yields = np.zeros(self.horizon)
+        self.planted_at = int(env.now)
+        self.wakeups = 0                     # timeouts + interrupts handled
+        self._filled = int(env.now)          # years before this are final
+        self._factors: Optional[np.ndarray] = None
+        self._base = cached_history(params) if base is None else base   # yields by age 0..end_year
+        self.process = env.process(self.run())
+
+    def apply(self, event: TreeEvent) -> None:
+        """Deliver an external event at the current simulation time."""
+        if event.kind not in TREE_EVENT_KINDS:
+            raise ValueError(f"Unknown event {event.kind!r}; expected one of {TREE_EVENT_KINDS}.")
+        if self.process.is_alive:
+            self.process.interrupt(event)
+
+    def _next_wakeup(self) -> int:
+        p = self.params
+        age = int(self.env.now) - self.planted_at
+        later = [b for b in (p.juvenile_years, p.exp_start_year, p.plateau_start_year,
+                             p.decline_start_year, p.end_year) if b > age]
+        return min(self.planted_at + min(later), self.horizon) if later else self.horizon
+
+    def _fill_to(self, t: int) -> None:
+        """Copy the base curve into yields[_filled:t] (years after removal stay 0)."""
+        t = min(t, self.horizon)
+        start = self._filled
+        if t <= start:
+            return
+        a0 = start - self.planted_at
+        a1 = min(t - self.planted_at, self._base.size)
+        if a1 > a0:
+            self.yields[start:start + a1 - a0] = self._base[a0:a1]
+        if self._factors is not None:
+            self.yields[start:t] *= self._factors[start:t]
+        self._filled = t
+
+    def _handle(self, event: TreeEvent) -> None:
+        now = int(self.env.now)
+        if event.kind == "replant":
+            self.planted_at = now
+            return
+        if self._factors is None:
+            self._factors = np.ones(self.horizon)
+        self._factors[now:now + max(event.years, 0)] *= event.factor
+
+    def run(self):
+        import simpy
+        while self.env.now < self.horizon:
+            try:
+                yield self.env.timeout(self._next_wakeup() - self.env.now)
+            except simpy.Interrupt as intr:
+                # Years so far keep the old planting/multipliers; later years are filled lazily
+                self._fill_to(int(self.env.now))
+                self._handle(intr.cause)
+            self.wakeups += 1
+        self._fill_to(self.horizon)
+
+
+class Orchard:
+    """
+    Many trees in struct-of-arrays form.
+
+    Each tree attribute is one contiguous NumPy column (planting year, the
+    LifecycleParams fields, current yield) instead of one AppleTree object per tree.
+    `step()` advances every tree by one calendar year in a single vectorized pass and
+    records the orchard total. Tree age is `year - planting_year`, so a tree planted
+    in year Y yields `yield_at_year(year - Y)`.
+    """
+
+    # Phase boundaries are small integers; magnitudes are stored as float32
+    _INT_FIELDS = ("juvenile_years", "exp_start_year", "plateau_start_year", "decline_start_year", "end_year")
+    _FLOAT_FIELDS = ("plateau_yield", "slow_max_fraction", "decline_fraction")
+
+    def __init__(self, planting_year, start_year: Optional[int] = None, **columns):
+        self.planting_year = np.ascontiguousarray(planting_year, dtype=np.int32).reshape(-1)
+        n = self.planting_year.size
+        defaults = LifecycleParams()
+        for name in self._INT_FIELDS + self._FLOAT_FIELDS:
+            dtype = np.int16 if name in self._INT_FIELDS else np.float32
+            col = np.asarray(columns.pop(name, getattr(defaults, name)), dtype=dtype)
+            setattr(self, name, np.ascontiguousarray(np.broadcast_to(col, (n,))))
+        if columns:
+            raise TypeError(f"Unknown Orchard columns: {sorted(columns)}")
+
+        # Per-tree constants of the piecewise curve, computed once (see yield_at_year)
+        plateau = self.plateau_yield
+        self._slow_target = self.slow_max_fraction * plateau
+        self._inv_juv = (1.0 / np.maximum(self.juvenile_years, 1)).astype(np.float32)
+        y0 = np.where(self._slow_target <= 0, np.float32(1e-6), self._slow_target)
+        bridge_span = self.plateau_start_year.astype(np.int32) - self.exp_start_year
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            k = np.log(plateau / y0) / bridge_span
+        # The bridge is only reached when exp_start_year < plateau_start_year and plateau > 0
+        self._bridge_y0 = np.where(plateau <= 0, np.float32(0.0), y0).astype(np.float32)
+        self._bridge_k = np.where((plateau > 0) & (bridge_span > 0), k, 0.0).astype(np.float32)
+        # Running maximum of the boundaries: counting the ones passed then gives the first
+        # `age < boundary` match, i.e. the `if` chain of yield_at_year, even when the
+        # per-tree boundaries are out of order
+        self._phase_bounds = np.maximum.accumulate(
+            np.stack([getattr(self, name) for name in self._INT_FIELDS[:4]]), axis=0
+        )
+        span = np.maximum((self.end_year.astype(np.int32) - 1) - self.decline_start_year, 1)
+        self._decline_slope = (self.decline_fraction * plateau / span).astype(np.float32)
+
+        if start_year is None:
+            start_year = int(self.planting_year.min()) if n else 0
+        self.year = int(start_year)
+        self.yields = np.zeros(n, dtype=np.float32)
+        self.years: List[int] = []
+        self.totals: List[float] = []
+
+    @classmethod
+    def from_params(
+        cls,
+        planting_year,
+        params: Union[LifecycleParams, Sequence[LifecycleParams]],
+        start_year: Optional[int] = None,
+    ) -> "Orchard":
+        """Build an orchard from one shared LifecycleParams or one per tree."""
+        if isinstance(params, LifecycleParams):
+            columns = {f.name: getattr(params, f.name) for f in fields(LifecycleParams)}
+        else:
+            columns = {f.name: [getattr(p, f.name) for p in params] for f in fields(LifecycleParams)}
+        return cls(planting_year, start_year=start_year, **columns)
+
+    def __len__(self) -> int:
+        return self.planting_year.size
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the per-tree columns."""
+        return sum(v.nbytes for v in vars(self).values() if isinstance(v, np.ndarray))
+
+    def step(self) -> float:
+        """Compute every tree's yield for the current year, record the total, advance one year."""
+        age = self.year - self.planting_year
+        out = self.yields
+        out.fill(0.0)
+
+        # Phase index per tree: 0 slow, 1 quiet, 2 exponential, 3 plateau, 4 decline, -1 not standing
+        bounds = self._phase_bounds
+        phase = (age >= bounds[0]).view(np.int8)
+        phase = phase + (age >= bounds[1])
+        phase += age >= bounds[2]
+        phase += age >= bounds[3]
+        phase[(age < 0) | (age >= self.end_year)] = -1
+
+        idx = np.flatnonzero(phase == 0)
+        out[idx] = (age[idx] * self._inv_juv[idx]) ** 2 * self._slow_target[idx]
+        idx = np.flatnonzero(phase == 1)
+        out[idx] = self._slow_target[idx]
+        idx = np.flatnonzero(phase == 2)
+        out[idx] = self._bridge_y0[idx] * np.exp(
+            self._bridge_k[idx] * (age[idx] - self.exp_start_year[idx])
+        )
+        idx = np.flatnonzero(phase == 3)
+        out[idx] = self.plateau_yield[idx]
+        idx = np.flatnonzero(phase == 4)
+        out[idx] = self.plateau_yield[idx] - self._decline_slope[idx] * (age[idx] - self.decline_start_year[idx])
+
+        total = float(out.sum(dtype=np.float64))
+        self.years.append(self.year)
+        self.totals.append(total)
+        self.year += 1
+        return total
+
+    def run(self, n_years: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Advance n_years and return (years, orchard totals) for every year recorded so far."""
+        for _ in range(n_years):
+            self.step()
+        return np.array(self.years, dtype=np.int32), np.array(self.totals, dtype=np.float64)
+
+
+# ---------------- Self-checks ----------------
+def check_lifecycle_summary(n_cases: int = 20_000, seed: int = 0, rtol: float = 1e-9) -> int:
+    """
+    Cross-check the closed-form `lifecycle_summary` against `simulate` on random
+    parameter sets, including out-of-order phase boundaries and zero plateau_yield /
+    slow_max_fraction. Checks both the scalar and the vectorized form; raises
+    AssertionError on the first mismatch and returns the number of cases checked.
+    """
+    rng = np.random.default_rng(seed)
+    params = []
+    for i in range(n_cases):
+        bounds = rng.integers(0, 130, 5)
+        if i % 3:   # two thirds in order, the rest left as drawn
+            bounds.sort()
+        plateau = 0.0 if i % 7 == 0 else float(rng.uniform(1.0, 200.0))
+        slow = 0.0 if i % 5 == 0 else float(rng.uniform(0.0, 1.0))
+        params.append(LifecycleParams(*(int(b) for b in bounds), plateau, slow, float(rng.uniform(0.0, 1.0))))
+
+    vec = lifecycle_summary(params)
+    for i, p in enumerate(params):
+        yields = np.array([y for _, y in simulate(p)])
+        expected = (yields.max(), yields.sum(), int((yields > 0).sum()))
+        for got in (lifecycle_summary(p), LifecycleSummary(vec.peak_yield[i], vec.total_yield[i], vec.productive_years[i])):
+            ok = (math.isclose(got.peak_yield, expected[0], rel_tol=rtol, abs_tol=1e-9)
+                  and math.isclose(got.total_yield, expected[1], rel_tol=rtol, abs_tol=1e-9)
+                  and got.productive_years == expected[2])
+            assert ok, f"lifecycle_summary mismatch for {p}: {got} vs simulated {expected}"
+    return n_cases
+
+
 if __name__ == "__main__":
+    print(f"lifecycle_summary matches simulate on {check_lifecycle_summary()} random parameter sets")
+
     # Quick smoke test
     p = LifecycleParams()
     data = simulate(p)
@@ -0,0 +1,302 @@
+# batch.py
+"""
+Headless batch runs: orchards under each station's historical climate, streamed to disk.
+
+For every station (preset slug or .txt URL) and every LifecycleParams scenario of a
+grid, compute per-year lifecycle yield, climate factor and climate-coupled yield
+(climate_yield). Each station is downloaded (through the on-disk HTTP cache) and
+parsed once, in the parent, a few stations at a time over one pooled session
+(`load_stations`); its one-station ClimateCube is then shipped with every task of
+(station, block of scenarios) to the worker processes. Only about two tasks per
+worker are in flight, and each finished task is written out immediately, so memory
+is bounded by the task size, not by the size of the run. Streamlit is never imported.
+
+Output (long format, one row per station x scenario x year):
+    station, scenario, <LifecycleParams fields>, Year, yield_kg, climate_factor, coupled_kg
+
+- CSV: one file. `<out>.manifest.jsonl` records the header size and each finished
+  task with the file size after its rows were flushed; on --resume the CSV is
+  truncated to the last recorded size (dropping rows of a task that was cut off, or
+  back to the header row if no task finished) and finished tasks are skipped. If
+  the CSV itself is gone, the run starts over.
+- Parquet (needs pyarrow): a directory of part-<task>.parquet files, each written to
+  a temporary name and renamed; on --resume existing parts are skipped.
+
+Example:
+  python batch.py --stations armagh oxford heathrow \\
+      --grid end_year=80,100,120 --grid plateau_yield=80,100 \\
+      --start-year 1950 --out runs/orchards.csv --workers 4
+  python batch.py ... --resume        # continue an interrupted run
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from apple_tree_sim import LifecycleParams
+from climate import ClimateCube
+from sweep import INT_FIELDS, PARAM_FIELDS, iter_bounded, param_grid, worker_count
+
+OUTPUT_COLUMNS = ["station", "scenario", *PARAM_FIELDS, "Year", "yield_kg", "climate_factor", "coupled_kg"]
+
+Task = Tuple[str, str, int, List[LifecycleParams]]     # (task id, station, first scenario, params)
+
+
+def parse_grid(specs: Sequence[str]) -> Dict[str, list]:
+    """['end_year=80,100', 'plateau_yield=90'] -> {'end_year': [80, 100], 'plateau_yield': [90.0]}."""
+    axes: Dict[str, list] = {}
+    for spec in specs:
+        name, _, values = spec.partition("=")
+        name = name.strip()
+        if name not in PARAM_FIELDS or not values:
+            raise ValueError(f"Bad grid axis {spec!r}; expected <field>=v1,v2,... with field in {list(PARAM_FIELDS)}.")
+        cast = int if name in INT_FIELDS else float
+        axes[name] = [cast(v) for v in values.split(",") if v.strip()]
+    return axes
+
+
+def _read_stations(items: Sequence[str]) -> List[str]:
+    """Station arguments; '@file' reads one station per line (# comments allowed)."""
+    out: List[str] = []
+    for item in items:
+        if item.startswith("@"):
+            for line in Path(item[1:]).read_text(encoding="utf-8").splitlines():
+                line = line.split("#", 1)[0].strip()
+                if line:
+                    out.append(line)
+        else:
+            out.append(item.strip())
+    return list(dict.fromkeys(s for s in out if s))
+
+
+def station_tasks(s_idx: int, station: str, scenarios: Sequence[LifecycleParams], block: int) -> Iterator[Task]:
+    for start in range(0, len(scenarios), block):
+        yield f"s{s_idx:04d}-p{start:07d}", station, start, list(scenarios[start:start + block])
+
+
+def _load_stations(stations: Sequence[str], start_year: int, batch: int) -> Iterator[Tuple[str, Optional[ClimateCube], Optional[Exception]]]:
+    """
+    (station, one-station ClimateCube, None) or (station, None, error) for every station,
+    loaded `batch` at a time so only a few parsed stations are held at once.
+    """
+    from app import load_stations
+
+    for i in range(0, len(stations), batch):
+        for station, df, error in load_stations(stations[i:i + batch], start_year=start_year):
+            if error is None:
+                try:
+                    yield station, ClimateCube.from_frames([(station, df)]), None
+                except ValueError as ex:          # no rows from start_year on
+                    yield station, None, ex
+            else:
+                yield station, None, error
+
+
+# ---------------- Worker ----------------
+def run_task(task: Task, cube: ClimateCube, planting_year: Optional[int]) -> Dict[str, np.ndarray]:
+    """Evaluate a block of scenarios on one station's climate; returns output columns."""
+    from apple_tree_sim import yield_curve
+    from climate_yield import climate_factors
+
+    _, station, first, params = task
+    plant = cube.first_year if planting_year is None else planting_year
+    base = yield_curve(cube.years - plant, params)                                  # (T, Y)
+    factors = climate_factors(cube.data)[0]                                        # (Y,)
+    coupled = base.astype(np.float32) * factors                                    # (T, Y), as coupled_yields
+
+    n_t, n_y = coupled.shape
+    cols: Dict[str, np.ndarray] = {
+        "station": np.full(n_t * n_y, station, dtype=object),
+        "scenario": np.repeat(np.arange(first, first + n_t), n_y),
+    }
+    for name in PARAM_FIELDS:
+        cols[name] = np.repeat(np.array([getattr(p, name) for p in params]), n_y)
+    cols["Year"] = np.tile(cube.years, n_t)
+    cols["yield_kg"] = base.reshape(-1)
+    cols["climate_factor"] = np.tile(factors, n_t)
+    cols["coupled_kg"] = coupled.reshape(-1)
+    return cols
+
+
+# ---------------- Sinks ----------------
+class CSVSink:
+    def __init__(self, path: Path, run_key: str, resume: bool):
+        self.path = path
+        self.manifest = path.with_name(path.name + ".manifest.jsonl")
+        self.done: Set[str] = set()
+        if not (resume and self.manifest.exists() and path.exists()):
+            self._start(run_key)
+            return
+        header, *entries = [json.loads(l) for l in self.manifest.read_text(encoding="utf-8").splitlines() if l.strip()]
+        if header.get("run_key") != run_key:
+            raise SystemExit(f"{self.manifest} belongs to a different run (stations/grid/options changed).")
+        # Keep the header row and every task whose rows are fully on disk; drop the rest
+        size = path.stat().st_size
+        offset = header.get("header_bytes", len(self._header()))
+        for e in entries:
+            if e["offset"] > size:
+                break
+            self.done.add(e["task"])
+            offset = e["offset"]
+        with open(path, "r+b") as f:
+            f.truncate(offset)
+
+    @staticmethod
+    def _header() -> bytes:
+        return (",".join(OUTPUT_COLUMNS) + "\n").encode("utf-8")
+
+    def _start(self, run_key: str) -> None:
+        """New file with only the header row; the manifest records the header's size."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        header = self._header()
+        self.path.write_bytes(header)
+        self.manifest.write_text(json.dumps({"run_key": run_key, "header_bytes": len(header)}) + "\n", encoding="utf-8")
+
+    def write(self, task_id: str, cols: Dict[str, np.ndarray]) -> None:
+        import pandas as pd
+        with open(self.path, "ab") as f:
+            pd.DataFrame(cols, columns=OUTPUT_COLUMNS).to_csv(f, header=False, index=False, lineterminator="\n")
+            f.flush()
+            os.fsync(f.fileno())
+            offset = f.tell()
+        with open(self.manifest, "a", encoding="utf-8") as m:
+            m.write(json.dumps({"task": task_id, "offset": offset}) + "\n")
+        self.done.add(task_id)
+
+
+class ParquetSink:
+    def __init__(self, path: Path, run_key: str, resume: bool):
+        try:
+            import pyarrow  # noqa: F401
+        except ModuleNotFoundError:
+            raise SystemExit("Parquet output needs pyarrow (pip install pyarrow); use a .csv --out instead.")
+        self.path = path
+        key_file = path / "_run_key"
+        if resume and key_file.exists():
+            if key_file.read_text(encoding="utf-8") != run_key:
+                raise SystemExit(f"{path} belongs to a different run (stations/grid/options changed).")
+        else:
+            path.mkdir(parents=True, exist_ok=True)
+            for part in path.glob("part-*.parquet"):
+                part.unlink()
+            key_file.write_text(run_key, encoding="utf-8")
+        self.done: Set[str] = {p.name[len("part-"):-len(".parquet")] for p in path.glob("part-*.parquet")}
+
+    def write(self, task_id: str, cols: Dict[str, np.ndarray]) -> None:
+        import pandas as pd
+        final = self.path / f"part-{task_id}.parquet"
+        tmp = final.with_suffix(".parquet.tmp")
+        pd.DataFrame(cols, columns=OUTPUT_COLUMNS).to_parquet(tmp, index=False)
+        os.replace(tmp, final)
+        self.done.add(task_id)
+
+
+# ---------------- Driver ----------------
+def run_batch(
+    stations: Sequence[str],
+    scenarios: Sequence[LifecycleParams],
+    out: str,
+    start_year: int = 1950,
+    planting_year: Optional[int] = None,
+    block: int = 100,
+    max_workers: Optional[int] = None,
+    resume: bool = False,
+    log=sys.stderr,
+) -> Dict[str, int]:
+    """Run every (station, scenario block) task not already on disk; returns counts."""
+    out_path = Path(out)
+    digest = hashlib.sha256(json.dumps({
+        "stations": list(stations), "start_year": start_year, "planting_year": planting_year, "block": block,
+    }, sort_keys=True).encode("utf-8"))
+    for p in scenarios:                   # one scenario at a time, never the whole grid as one JSON
+        digest.update(json.dumps(asdict(p), sort_keys=True).encode("utf-8"))
+    run_key = digest.hexdigest()
+    sink_cls = ParquetSink if out_path.suffix.lower() in (".parquet", ".pq") else CSVSink
+    sink = sink_cls(out_path, run_key, resume)
+
+    stats = {"skipped": len(sink.done), "written": 0, "failed": 0, "rows": 0}
+    n_pending = len(stations) * -(-len(scenarios) // block) - len(sink.done)
+    max_workers = worker_count(max_workers)
+
+    def finish(task: Task, cols: Optional[Dict[str, np.ndarray]], error: Optional[BaseException]) -> None:
+        if error is not None:
+            stats["failed"] += 1
+            print(f"[{task[0]}] {task[1]}: FAILED ({type(error).__name__}: {error})", file=log, flush=True)
+            return
+        sink.write(task[0], cols)
+        stats["written"] += 1
+        stats["rows"] += len(cols["Year"])
+        print(f"[{task[0]}] {task[1]}: {len(task[3])} scenarios, {len(cols['Year'])} rows "
+              f"({stats['written'] + stats['failed']}/{n_pending})", file=log, flush=True)
+
+    def pending(s_idx: int, station: str) -> Iterator[Task]:
+        return (t for t in station_tasks(s_idx, station, scenarios, block) if t[0] not in sink.done)
+
+    def jobs() -> Iterator[Tuple[Task, ClimateCube]]:
+        """
+        (task, station cube) as stations load, each station's tasks generated only once its
+        cube is in hand; tasks of a station that fails are finished as failed.
+        """
+        indices: Dict[str, List[int]] = {}     # stations with work left -> positions in `stations`
+        for s_idx, station in enumerate(stations):
+            if next(pending(s_idx, station), None) is not None:
+                indices.setdefault(station, []).append(s_idx)
+        for station, cube, error in _load_stations(list(indices), start_year, batch=max(8, 2 * max_workers)):
+            for s_idx in indices[station]:
+                for task in pending(s_idx, station):
+                    if error is not None:
+                        finish(task, None, error)
+                    else:
+                        yield task, cube
+
+    if max_workers == 1:
+        for task, cube in jobs():
+            try:
+                finish(task, run_task(task, cube, planting_year), None)
+            except Exception as ex:
+                finish(task, None, ex)
+        return stats
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        calls = ((task, (task, cube, planting_year)) for task, cube in jobs())
+        for task, fut in iter_bounded(pool, run_task, calls, max_workers):
+            error = fut.exception()
+            finish(task, None if error else fut.result(), error)
+    return stats
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Orchard yield under station climate, streamed to CSV/Parquet.")
+    ap.add_argument("--stations", nargs="+", required=True, help="preset slugs, .txt URLs or @file with one per line")
+    ap.add_argument("--grid", action="append", default=[], metavar="FIELD=V1,V2",
+                    help="LifecycleParams axis (repeatable); the run covers the Cartesian product")
+    ap.add_argument("--out", required=True, help="output .csv file or .parquet directory")
+    ap.add_argument("--start-year", type=int, default=1950)
+    ap.add_argument("--planting-year", type=int, default=None, help="default: first year of each station's data")
+    ap.add_argument("--block", type=int, default=100, help="scenarios per task")
+    ap.add_argument("--workers", type=int, default=None, help="worker processes (default: all CPUs)")
+    ap.add_argument("--resume", action="store_true", help="skip tasks already written by a previous run")
+    args = ap.parse_args(argv)
+
+    try:
+        scenarios = list(param_grid(**parse_grid(args.grid)))
+    except ValueError as ex:
+        ap.error(str(ex))
+    stations = _read_stations(args.stations)
+    print(f"{len(stations)} stations x {len(scenarios)} scenarios -> {args.out}", file=sys.stderr)
+    stats = run_batch(stations, scenarios, args.out, start_year=args.start_year, planting_year=args.planting_year,
+                      block=args.block, max_workers=args.workers, resume=args.resume)
+    print(json.dumps(stats), file=sys.stderr)
+    return 1 if stats["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
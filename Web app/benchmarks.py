@@ -0,0 +1,358 @@
+# benchmarks.py
+"""
+Reproducible benchmarks for the model, the station parser and the station pipeline.
+
+Each benchmark is a named case with parameters (asv style); a case's setup runs once,
+then the timed callable is calibrated to run for about `min_time` seconds per sample
+and sampled `repeat` times. Results, with git commit and library versions, are written
+as JSON so two runs can be compared automatically.
+
+Run from "Web app/":
+  python benchmarks.py run -o bench.json              # everything
+  python benchmarks.py run -k parser --quick          # filter by name, skip 100x files
+  python benchmarks.py compare old.json new.json      # exit code 1 on a regression
+  python benchmarks.py budget                         # import-time budget, exit code 1 if over
+
+Station loads go through a local stand-in HTTP server (ETag/304 support) serving
+synthetic station files, with the HTTP cache and station store in temporary
+directories, so nothing touches the Met Office or ~/.cache.
+
+Startup cases import a module in a fresh interpreter. `budget` checks the cold import
+time of each module in IMPORT_BUDGET_MS and that none of LAZY_MODULES is imported
+eagerly.
+"""
+
+import argparse
+import http.server
+import itertools
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+SIZES = (1, 10, 100)           # synthetic station file multiples
+LAYOUTS = ("mm", "wide")
+
+
+@dataclass
+class Case:
+    name: str
+    params: Dict[str, object]
+    setup: Callable[..., Callable[[], object]]    # setup(**params) -> timed callable
+
+
+@dataclass
+class Result:
+    name: str
+    params: Dict[str, object]
+    number: int                  # calls per sample
+    repeat: int
+    min: float                   # seconds per call
+    median: float
+    mean: float
+    stdev: float
+    samples: List[float] = field(default_factory=list)
+
+    @property
+    def key(self) -> str:
+        return self.name + "".join(f"[{k}={v}]" for k, v in self.params.items())
+
+
+CASES: List[Case] = []
+
+
+def benchmark(name: str, **params: Sequence):
+    """Register `setup` for every combination of the given parameter values."""
+    def register(setup):
+        keys = list(params)
+        for combo in itertools.product(*(params[k] for k in keys)):
+            CASES.append(Case(name, dict(zip(keys, combo)), setup))
+        return setup
+    return register
+
+
+def measure(fn: Callable[[], object], repeat: int = 5, min_time: float = 0.2) -> Tuple[int, List[float]]:
+    """(calls per sample, per-call seconds of each sample)."""
+    t0 = time.perf_counter(); fn(); first = time.perf_counter() - t0
+    number = max(1, int(min_time / max(first, 1e-9)))
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - t0) / number)
+    return number, samples
+
+
+# ---------------- Model ----------------
+@benchmark("model.yield_at_year", end_year=(60, 100, 200))
+def _bench_yield_at_year(end_year: int):
+    from apple_tree_sim import LifecycleParams, yield_at_year
+    p = LifecycleParams(end_year=end_year)
+    return lambda: [yield_at_year(y, p) for y in range(end_year)]
+
+
+@benchmark("model.simulate", engine=("direct", "simpy", "phases"), end_year=(100, 200))
+def _bench_simulate(engine: str, end_year: int):
+    from apple_tree_sim import LifecycleParams, simulate
+    p = LifecycleParams(end_year=end_year)
+    return lambda: simulate(p, engine=engine, cache=False)     # uncached: no history LRU hits
+
+
+@benchmark("model.simulate_trees", trees=(10, 100, 1000))
+def _bench_simulate_trees(trees: int):
+    from apple_tree_sim import LifecycleParams, simulate
+    params = [LifecycleParams(end_year=90 + i % 40, plateau_yield=80.0 + i % 50) for i in range(trees)]
+    return lambda: [simulate(p) for p in params]
+
+
+@benchmark("model.orchard", trees=(1_000, 10_000, 100_000))
+def _bench_orchard(trees: int):
+    from apple_tree_sim import Orchard
+    i = np.arange(trees)
+    return lambda: Orchard(i % 50, end_year=90 + i % 40, plateau_yield=80.0 + i % 50).run(150)
+
+
+# ---------------- Parser ----------------
+def _station_text(layout: str, size: int) -> str:
+    from station_parser import synthetic_station_text
+    return synthetic_station_text(layout=layout, repeats=size)
+
+
+@benchmark("parser.scan_wide_tables", size=SIZES)
+def _bench_scan_wide(size: int):
+    from station_parser_legacy import _scan_wide_tables
+    lines = _station_text("wide", size).splitlines()
+    return lambda: _scan_wide_tables(lines)
+
+
+@benchmark("parser.parse_mm_table", size=SIZES)
+def _bench_parse_mm(size: int):
+    from station_parser_legacy import _is_mm_header, _parse_mm_table
+    lines = _station_text("mm", size).splitlines()
+    headers = [i for i, line in enumerate(lines) if _is_mm_header(line)]
+    return lambda: [_parse_mm_table(lines, i) for i in headers]
+
+
+@benchmark("parser.build_tmean_df", layout=LAYOUTS, size=SIZES)
+def _bench_build_tmean_df(layout: str, size: int):
+    from app import _build_tmean_df
+    text = _station_text(layout, size)
+    return lambda: _build_tmean_df(text)
+
+
+# ---------------- Rendering ----------------
+@benchmark("render.line_png", years=(30, 170, 1700), cached=(False, True))
+def _bench_render(years: int, cached: bool):
+    """Station-style monthly series; uncached draws show the cost is flat in the span."""
+    import charts
+    dates = np.datetime64("1850-01", "M") + np.arange(years * 12)
+    tmean = 9.0 + 6.0 * np.sin(np.arange(years * 12) / 12 * 2 * np.pi)
+
+    def run():
+        if not cached:
+            charts.clear_cache()
+        return charts.render_line_png(dates, tmean, title="bench", xlabel="Date", ylabel="degC")
+    return run
+
+
+# ---------------- Station pipeline ----------------
+class _StationHandler(http.server.BaseHTTPRequestHandler):
+    """Serves synthetic station files by path, with ETag revalidation."""
+    files: Dict[str, bytes] = {}
+
+    def do_GET(self):
+        body = self.files.get(self.path)
+        if body is None:
+            self.send_response(404); self.end_headers(); return
+        etag = f'"{len(body)}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304); self.end_headers(); return
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+_SERVER: Optional[http.server.ThreadingHTTPServer] = None
+_TMP: Optional[tempfile.TemporaryDirectory] = None      # removed when the process exits
+
+
+def _serve(path: str, text: str) -> str:
+    global _SERVER
+    if _SERVER is None:
+        _SERVER = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _StationHandler)
+        threading.Thread(target=_SERVER.serve_forever, daemon=True).start()
+    _StationHandler.files[path] = text.encode("utf-8")
+    return f"http://127.0.0.1:{_SERVER.server_address[1]}{path}"
+
+
+@benchmark("station.load", mode=("uncached", "cached", "store"), layout=LAYOUTS, size=(1, 10))
+def _bench_station_load(mode: str, layout: str, size: int):
+    """
+    uncached: full download + parse every call; cached: 304 revalidation + parse;
+    store: 304 revalidation + unchanged-text skip + memory-mapped frame (Station tab path).
+    """
+    import app
+    from http_cache import DiskHTTPCache
+    from station_store import StationStore
+
+    global _TMP
+    _TMP = _TMP or tempfile.TemporaryDirectory(prefix="apple_bench_")
+    tmp = Path(_TMP.name) / f"{mode}-{layout}-{size}"
+    app.HTTP_CACHE = DiskHTTPCache(tmp / "http")
+    store = StationStore(tmp / "store")
+    url = _serve(f"/{layout}{size}.txt", _station_text(layout, size))
+
+    if mode == "uncached":
+        def run():
+            app.HTTP_CACHE.clear()
+            return app._build_tmean_df(app._download_text(url))
+    elif mode == "cached":
+        app._download_text(url)
+        def run():
+            return app._build_tmean_df(app._download_text(url))
+    else:
+        store.update(url, app._download_text(url))
+        def run():
+            store.update(url, app._download_text(url))
+            return store.frame(url)
+    return run
+
+
+# ---------------- Startup ----------------
+IMPORT_BUDGET_MS = {           # cold import in a fresh interpreter (numpy alone is ~100 ms)
+    "app": 300,
+    "apple_tree_sim": 250,
+    "station_store": 250,
+}
+LAZY_MODULES = ("pandas", "requests", "simpy", "matplotlib", "streamlit")
+
+
+def import_cost(module: str) -> Tuple[float, List[str]]:
+    """(milliseconds to import `module` in a fresh interpreter, LAZY_MODULES it loaded)."""
+    code = (
+        "import json, sys, time\n"
+        f"t0 = time.perf_counter(); import {module}; ms = (time.perf_counter() - t0) * 1e3\n"
+        f"print(json.dumps([ms, [m for m in {LAZY_MODULES!r} if m in sys.modules]]))"
+    )
+    out = subprocess.run([sys.executable, "-c", code], cwd=Path(__file__).parent,
+                         capture_output=True, text=True, check=True).stdout
+    ms, loaded = json.loads(out.strip().splitlines()[-1])
+    return ms, loaded
+
+
+@benchmark("startup.import", module=tuple(IMPORT_BUDGET_MS))
+def _bench_import(module: str):
+    """Wall time of a fresh interpreter importing `module` (includes interpreter start)."""
+    return lambda: import_cost(module)
+
+
+def check_budget(samples: int = 5) -> bool:
+    ok = True
+    for module, budget in IMPORT_BUDGET_MS.items():
+        runs = [import_cost(module) for _ in range(samples)]
+        ms = statistics.median(r[0] for r in runs)
+        eager = sorted(set().union(*(r[1] for r in runs)))
+        status = "ok" if ms <= budget and not eager else "OVER"
+        ok &= status == "ok"
+        print(f"{module:20s} {ms:8.1f} ms  (budget {budget} ms)  {status}"
+              + (f"  eagerly imports {', '.join(eager)}" if eager else ""))
+    return ok
+
+
+# ---------------- Running and comparing ----------------
+def _metadata() -> Dict[str, object]:
+    import pandas as pd
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+                                cwd=Path(__file__).parent).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+    }
+
+
+def run_benchmarks(pattern: str = "", quick: bool = False, repeat: int = 5, min_time: float = 0.2) -> Iterator[Result]:
+    for case in CASES:
+        if pattern not in case.name or (quick and case.params.get("size") == 100):
+            continue
+        fn = case.setup(**case.params)
+        number, samples = measure(fn, repeat=repeat, min_time=min_time)
+        yield Result(
+            case.name, case.params, number, repeat,
+            min=min(samples), median=statistics.median(samples), mean=statistics.fmean(samples),
+            stdev=statistics.stdev(samples) if len(samples) > 1 else 0.0, samples=samples,
+        )
+
+
+def compare(old: Dict, new: Dict) -> List[Tuple[str, float, float, float]]:
+    """(key, old min, new min, ratio) for every benchmark present in both runs."""
+    def by_key(doc):
+        return {r["name"] + "".join(f"[{k}={v}]" for k, v in r["params"].items()): r["min"] for r in doc["results"]}
+    a, b = by_key(old), by_key(new)
+    return [(k, a[k], b[k], b[k] / a[k]) for k in a if k in b and a[k] > 0]
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    r = sub.add_parser("run", help="run benchmarks and write JSON")
+    r.add_argument("-o", "--output", default="bench.json")
+    r.add_argument("-k", "--filter", default="", help="only names containing this string")
+    r.add_argument("--quick", action="store_true", help="skip the 100x station files")
+    r.add_argument("--repeat", type=int, default=5)
+    r.add_argument("--min-time", type=float, default=0.2, help="seconds per sample")
+    c = sub.add_parser("compare", help="compare two JSON results")
+    c.add_argument("old")
+    c.add_argument("new")
+    c.add_argument("--threshold", type=float, default=1.2, help="slowdown ratio counted as a regression")
+    b = sub.add_parser("budget", help="check cold import times against IMPORT_BUDGET_MS")
+    b.add_argument("--samples", type=int, default=5)
+    args = ap.parse_args(argv)
+
+    if args.cmd == "budget":
+        return 0 if check_budget(args.samples) else 1
+
+    if args.cmd == "run":
+        results = []
+        for res in run_benchmarks(args.filter, args.quick, args.repeat, args.min_time):
+            print(f"{res.key:60s} {res.min * 1e3:10.3f} ms  (median {res.median * 1e3:.3f}, x{res.number})", flush=True)
+            results.append(asdict(res))
+        Path(args.output).write_text(json.dumps({"meta": _metadata(), "results": results}, indent=1), encoding="utf-8")
+        print(f"wrote {len(results)} results to {args.output}")
+        return 0
+
+    old = json.loads(Path(args.old).read_text(encoding="utf-8"))
+    new = json.loads(Path(args.new).read_text(encoding="utf-8"))
+    regressions = 0
+    for key, t_old, t_new, ratio in compare(old, new):
+        flag = "REGRESSION" if ratio > args.threshold else ("faster" if ratio < 1 / args.threshold else "")
+        regressions += ratio > args.threshold
+        print(f"{key:60s} {t_old * 1e3:10.3f} -> {t_new * 1e3:10.3f} ms  {ratio:5.2f}x  {flag}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
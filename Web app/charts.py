@@ -0,0 +1,142 @@
+# charts.py
+"""
+Cached, downsampled line-chart rendering shared by the app's tabs.
+
+`render_line_png` draws one series with matplotlib's object API (Figure + Agg canvas,
+no pyplot global state) and returns PNG bytes. Results are kept in a small in-process
+LRU keyed by a hash of the x/y data plus every plot option, so an unchanged chart
+costs one hash on rerun instead of a new figure.
+
+Series longer than `max_points` are first reduced with Largest-Triangle-Three-Buckets
+(LTTB), which keeps the first and last points and, per bucket, the point forming
+the largest triangle with its neighbours, so peaks and troughs survive. Drawing time
+then depends on `max_points`, not on the length of the series.
+
+Example:
+    png = render_line_png(df["Date"], df["tmean"], title="Armagh", ylabel="°C")
+    st.image(png)
+"""
+
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import numpy as np
+
+from perf import PERF
+
+DEFAULT_MAX_POINTS = 1500
+CACHE_ENTRIES = 64
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Indices of the LTTB-selected points of (x, y) (both 1-D float, x increasing).
+    Returns all indices when the series already has n_out points or fewer.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    # n - 2 interior points split into n_out - 2 buckets
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    # Mean of every bucket, used as the third vertex for the bucket before it
+    cx, cy = np.cumsum(np.r_[0.0, x]), np.cumsum(np.r_[0.0, y])
+    nxt_lo, nxt_hi = edges[1:], np.r_[edges[2:], n]
+    counts = nxt_hi - nxt_lo
+    avg_x = (cx[nxt_hi] - cx[nxt_lo]) / counts
+    avg_y = (cy[nxt_hi] - cy[nxt_lo]) / counts
+
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for b in range(n_out - 2):
+        lo, hi = edges[b], edges[b + 1]
+        bx, by = x[lo:hi], y[lo:hi]
+        # Twice the triangle area with vertex a and the next bucket's mean
+        area = np.abs((x[a] - avg_x[b]) * (by - y[a]) - (x[a] - bx) * (avg_y[b] - y[a]))
+        a = lo + int(np.argmax(area))
+        out[b + 1] = a
+    return out
+
+
+def downsample(x, y, max_points: int = DEFAULT_MAX_POINTS) -> Tuple[np.ndarray, np.ndarray]:
+    """Drop non-finite y values and reduce to at most max_points with LTTB."""
+    x, y = np.asarray(x), np.asarray(y, dtype=np.float64)
+    keep = np.isfinite(y)
+    x, y = x[keep], y[keep]
+    xf = x.astype("datetime64[s]").astype(np.float64) if np.issubdtype(x.dtype, np.datetime64) else x.astype(np.float64)
+    idx = lttb(xf, y, max_points)
+    return x[idx], y[idx]
+
+
+# ---------------- Rendering ----------------
+_cache: "OrderedDict[str, bytes]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def _key(x: np.ndarray, y: np.ndarray, options: Tuple) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    for arr in (x, y):
+        h.update(str(arr.dtype).encode())
+        h.update(np.ascontiguousarray(arr).tobytes())
+    h.update(repr(options).encode("utf-8"))
+    return h.hexdigest()
+
+
+def render_line_png(
+    x,
+    y,
+    title: str = "",
+    xlabel: str = "",
+    ylabel: str = "",
+    linewidth: float = 1.7,
+    grid_alpha: float = 0.35,
+    max_points: int = DEFAULT_MAX_POINTS,
+    figsize: Tuple[float, float] = (8.0, 4.5),
+    dpi: int = 100,
+) -> Optional[bytes]:
+    """
+    PNG bytes of a line chart of y against x (None if matplotlib is not installed).
+    Identical data and options return the cached bytes.
+    """
+    x, y = np.asarray(x), np.asarray(y)
+    options = (title, xlabel, ylabel, linewidth, grid_alpha, max_points, figsize, dpi)
+    key = _key(x, y, options)
+    with _lock:
+        png = _cache.get(key)
+        if png is not None:
+            _cache.move_to_end(key)
+            PERF.count("render.cache_hits")
+            return png
+
+    try:
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+    except ModuleNotFoundError:
+        return None
+
+    with PERF.span("render.draw", points=len(x)):
+        xs, ys = downsample(x, y, max_points)
+        fig = Figure(figsize=figsize, dpi=dpi)
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+        ax.plot(xs, ys, linewidth=linewidth)
+        ax.set_xlabel(xlabel); ax.set_ylabel(ylabel); ax.set_title(title)
+        ax.grid(True, linestyle="--", alpha=grid_alpha)
+        fig.tight_layout()
+        buf = io.BytesIO()
+        fig.savefig(buf, format="png")
+        png = buf.getvalue()
+
+    with _lock:
+        _cache[key] = png
+        while len(_cache) > CACHE_ENTRIES:
+            _cache.popitem(last=False)
+    return png
+
+
+def clear_cache() -> None:
+    with _lock:
+        _cache.clear()
@@ -0,0 +1,194 @@
+# climate.py
+"""
+Aggregate indexes over monthly station temperatures.
+
+`ClimateIndex` is built once per station: for each variable it holds NaN-aware
+cumulative sums and counts per calendar month over a dense year axis. Any year range
+[yr0, yr1] then costs two row lookups per month, so the climatology, range mean and
+anomalies come back in O(12) without filtering or copying the station frame.
+
+`ClimateCube` packs many stations into one station x year x month array for
+vectorized cross-station statistics (climatologies, anomalies, trends, rankings).
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+MONTH_LABELS = ["Jan","Feb","Mar","Apr","May","Jun","Jul","Aug","Sep","Oct","Nov","Dec"]
+
+
+class ClimateIndex:
+    def __init__(self, years: np.ndarray, months: np.ndarray, columns: Dict[str, np.ndarray]):
+        years = np.asarray(years, dtype=np.int64)
+        months = np.asarray(months, dtype=np.int64)
+        self.first_year = int(years.min())
+        self.last_year = int(years.max())
+        n = self.last_year - self.first_year + 1
+        row, col = years - self.first_year, months - 1
+
+        # cumsum[k, m] / count[k, m]: totals of month m over the first k years
+        self._cumsum: Dict[str, np.ndarray] = {}
+        self._count: Dict[str, np.ndarray] = {}
+        for var, values in columns.items():
+            grid = np.full((n, 12), np.nan)
+            grid[row, col] = values
+            finite = ~np.isnan(grid)
+            cs = np.zeros((n + 1, 12))
+            np.cumsum(np.where(finite, grid, 0.0), axis=0, out=cs[1:])
+            cc = np.zeros((n + 1, 12), dtype=np.int32)
+            np.cumsum(finite, axis=0, out=cc[1:])
+            self._cumsum[var], self._count[var] = cs, cc
+
+    @classmethod
+    def from_frame(cls, df, variables: Iterable[str] = ("tmean", "tmax", "tmin")) -> "ClimateIndex":
+        """Build from a station frame (Year, Month and the given variable columns)."""
+        return cls(
+            df["Year"].to_numpy(),
+            df["Month"].to_numpy(),
+            {v: df[v].to_numpy(dtype=np.float64) for v in variables if v in df.columns},
+        )
+
+    @property
+    def variables(self) -> Tuple[str, ...]:
+        return tuple(self._cumsum)
+
+    def _rows(self, yr0: int, yr1: int) -> Tuple[int, int]:
+        """Half-open row range of the cumulative arrays covering [yr0, yr1]."""
+        n = self.last_year - self.first_year + 1
+        i0 = min(max(int(yr0) - self.first_year, 0), n)
+        i1 = min(max(int(yr1) - self.first_year + 1, i0), n)
+        return i0, i1
+
+    def totals(self, yr0: int, yr1: int, var: str = "tmean") -> Tuple[np.ndarray, np.ndarray]:
+        """Per-calendar-month (sum, count) of non-missing values in [yr0, yr1]."""
+        i0, i1 = self._rows(yr0, yr1)
+        cs, cc = self._cumsum[var], self._count[var]
+        return cs[i1] - cs[i0], cc[i1] - cc[i0]
+
+    def climatology(self, yr0: int, yr1: int, var: str = "tmean") -> np.ndarray:
+        """Mean of each calendar month (Jan..Dec) over [yr0, yr1]; NaN where no data."""
+        s, c = self.totals(yr0, yr1, var)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(c > 0, s / c, np.nan)
+
+    def range_mean(self, yr0: int, yr1: int, var: str = "tmean") -> float:
+        """Mean over every non-missing month in [yr0, yr1]."""
+        s, c = self.totals(yr0, yr1, var)
+        total = int(c.sum())
+        return float(s.sum() / total) if total else float("nan")
+
+    def anomaly(
+        self, yr0: int, yr1: int, base_yr0: int, base_yr1: int, var: str = "tmean"
+    ) -> np.ndarray:
+        """Climatology of [yr0, yr1] minus the climatology of the baseline years, per month."""
+        return self.climatology(yr0, yr1, var) - self.climatology(base_yr0, base_yr1, var)
+
+
+class ClimateCube:
+    """
+    Many stations packed into one NaN-padded float32 array of shape
+    (station, year, month) on a shared year axis, so statistics for every station come
+    from one NumPy pass instead of a per-station groupby.
+    """
+
+    def __init__(self, stations: List[str], first_year: int, data: np.ndarray):
+        self.stations = list(stations)
+        self.first_year = int(first_year)
+        self.data = data                              # (S, Y, 12) float32, NaN = missing
+        self.years = np.arange(self.first_year, self.first_year + data.shape[1])
+
+    @classmethod
+    def from_frames(cls, frames: Iterable[Tuple[str, "object"]], var: str = "tmean") -> "ClimateCube":
+        """Build from (station, station frame) pairs; frames need Year, Month and `var`."""
+        named = [(name, df) for name, df in frames if df is not None and len(df)]
+        if not named:
+            raise ValueError("No station frames to pack.")
+        first = min(int(df["Year"].min()) for _, df in named)
+        last = max(int(df["Year"].max()) for _, df in named)
+        data = np.full((len(named), last - first + 1, 12), np.nan, dtype=np.float32)
+        for s, (_, df) in enumerate(named):
+            rows = df["Year"].to_numpy().astype(np.int64) - first
+            cols = df["Month"].to_numpy().astype(np.int64) - 1
+            data[s, rows, cols] = df[var].to_numpy(dtype=np.float32)
+        return cls([name for name, _ in named], first, data)
+
+    def _slice(self, yr0: Optional[int], yr1: Optional[int]) -> np.ndarray:
+        i0 = 0 if yr0 is None else max(int(yr0) - self.first_year, 0)
+        i1 = len(self.years) if yr1 is None else max(int(yr1) - self.first_year + 1, i0)
+        return self.data[:, i0:i1]                    # a view, not a copy
+
+    # ---------- missing data ----------
+    @property
+    def missing(self) -> np.ndarray:
+        """(S, Y, 12) True where a station has no value for that month."""
+        return np.isnan(self.data)
+
+    def coverage(self, yr0: Optional[int] = None, yr1: Optional[int] = None) -> np.ndarray:
+        """(S,) fraction of months with data in [yr0, yr1]."""
+        sub = self._slice(yr0, yr1)
+        return (~np.isnan(sub)).mean(axis=(1, 2)) if sub.size else np.zeros(len(self.stations))
+
+    # ---------- statistics ----------
+    def climatology(self, yr0: Optional[int] = None, yr1: Optional[int] = None) -> np.ndarray:
+        """(S, 12) mean of each calendar month over [yr0, yr1]; NaN where no data."""
+        sub = self._slice(yr0, yr1)
+        valid = ~np.isnan(sub)
+        count = valid.sum(axis=1)
+        total = np.where(valid, sub, 0).sum(axis=1, dtype=np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(count > 0, total / count, np.nan)
+
+    def anomalies(self, base_yr0: Optional[int] = None, base_yr1: Optional[int] = None) -> np.ndarray:
+        """(S, Y, 12) departures from each station's monthly climatology over the baseline."""
+        clim = self.climatology(base_yr0, base_yr1).astype(np.float32)
+        return self.data - clim[:, None, :]
+
+    def annual_means(self, min_months: int = 12) -> np.ndarray:
+        """(S, Y) mean of each year; NaN when fewer than `min_months` months have data."""
+        valid = ~np.isnan(self.data)
+        count = valid.sum(axis=2)
+        total = np.where(valid, self.data, 0).sum(axis=2, dtype=np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(count >= min_months, total / np.maximum(count, 1), np.nan)
+
+    def trend(self, yr0: Optional[int] = None, yr1: Optional[int] = None, min_years: int = 10) -> np.ndarray:
+        """(S,) least-squares slope of annual means in degC per decade (NaN if too few years)."""
+        i0 = 0 if yr0 is None else max(int(yr0) - self.first_year, 0)
+        i1 = len(self.years) if yr1 is None else max(int(yr1) - self.first_year + 1, i0)
+        a = self.annual_means()[:, i0:i1]
+        x = self.years[i0:i1].astype(np.float64)[None, :]
+        valid = ~np.isnan(a)
+        n = valid.sum(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            xm = (x * valid).sum(axis=1) / n
+            ym = np.where(valid, a, 0).sum(axis=1) / n
+            dx = np.where(valid, x - xm[:, None], 0)
+            slope = (dx * np.where(valid, a - ym[:, None], 0)).sum(axis=1) / (dx ** 2).sum(axis=1)
+        return np.where(n >= min_years, slope * 10.0, np.nan)
+
+    def range_means(self, yr0: Optional[int] = None, yr1: Optional[int] = None) -> np.ndarray:
+        """(S,) mean over every month with data in [yr0, yr1]."""
+        sub = self._slice(yr0, yr1)
+        valid = ~np.isnan(sub)
+        count = valid.sum(axis=(1, 2))
+        total = np.where(valid, sub, 0).sum(axis=(1, 2), dtype=np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(count > 0, total / count, np.nan)
+
+    def rank_stations(self, yr0: Optional[int] = None, yr1: Optional[int] = None) -> np.ndarray:
+        """(S,) rank of each station by mean over [yr0, yr1] (1 = warmest; NaN if no data)."""
+        return _rank_desc(self.range_means(yr0, yr1)[None, :])[0]
+
+    def rank_years(self) -> np.ndarray:
+        """(S, Y) rank of each year's annual mean within its station (1 = warmest)."""
+        return _rank_desc(self.annual_means())
+
+
+def _rank_desc(values: np.ndarray) -> np.ndarray:
+    """Row-wise descending ranks starting at 1; NaN stays NaN."""
+    order = np.argsort(-np.nan_to_num(values, nan=-np.inf), axis=1, kind="stable")
+    ranks = np.empty(values.shape, dtype=np.float64)
+    np.put_along_axis(ranks, order, np.broadcast_to(np.arange(1, values.shape[1] + 1, dtype=np.float64), values.shape), axis=1)
+    ranks[np.isnan(values)] = np.nan
+    return ranks
@@ -0,0 +1,92 @@
+# climate_yield.py
+"""
+Climate-coupled yield: the lifecycle curve from apple_tree_sim modulated, year by
+year, by a temperature response computed from station monthly mean temperatures.
+
+Per calendar year the response combines two monthly-resolution indices:
+- growing degree days (GDD) over the growing season (Apr..Oct):
+  sum of days_in_month * max(tmean - gdd_base, 0)
+- winter chill over Nov..Feb (Nov/Dec of the previous year with Jan/Feb of the
+  current one): days_in_month weighted 1 at or below chill_full, falling linearly to
+  0 at chill_zero
+
+factor = clip(GDD / gdd_target, 0, 1) * clip(chill / chill_required, 0, 1)
+
+Everything is an array operation over (station, tree or parameter set, year), so
+"orchard at station X under historical climate" runs for all stations and thousands
+of parameter sets without a Python loop per tree-year.
+
+Example:
+    cube = ClimateCube.from_frames(frames)
+    y = coupled_yields(cube, [LifecycleParams(), LifecycleParams(end_year=80)], planting_year=1950)
+    y.shape  # (n_stations, 2, n_years)
+"""
+
+from dataclasses import dataclass
+from typing import Sequence, Union
+
+import numpy as np
+
+from apple_tree_sim import LifecycleParams, _params_columns, _yield_curve_arrays
+from climate import ClimateCube
+
+DAYS_IN_MONTH = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31], dtype=np.float32)
+GROWING_MONTHS = np.arange(3, 10)      # Apr..Oct (0-based)
+
+
+@dataclass(frozen=True)
+class ClimateResponse:
+    gdd_base: float = 10.0           # degC above which growth accumulates
+    gdd_target: float = 500.0        # season GDD at which yield is no longer heat-limited
+    chill_full: float = 7.0          # monthly tmean (degC) counting as full chill
+    chill_zero: float = 13.0         # monthly tmean (degC) giving no chill
+    chill_required: float = 60.0     # chill days (Nov..Feb) needed for full bud break
+    missing_factor: float = 1.0      # factor for years without complete climate data
+
+
+def growing_degree_days(tmean: np.ndarray, base: float = 10.0) -> np.ndarray:
+    """(..., Y, 12) monthly tmean -> (..., Y) GDD over Apr..Oct (NaN if any month missing)."""
+    season = tmean[..., GROWING_MONTHS]
+    return (np.maximum(season - base, 0) * DAYS_IN_MONTH[GROWING_MONTHS]).sum(axis=-1)
+
+
+def chill_days(tmean: np.ndarray, full: float = 7.0, zero: float = 13.0) -> np.ndarray:
+    """
+    (..., Y, 12) monthly tmean -> (..., Y) chill days of the winter ending in each year.
+    The first year has no preceding Nov/Dec and is NaN.
+    """
+    weight = np.clip((zero - tmean) / (zero - full), 0, 1) * DAYS_IN_MONTH
+    jan_feb = weight[..., [0, 1]].sum(axis=-1)
+    nov_dec = weight[..., [10, 11]].sum(axis=-1)
+    prev = np.full_like(nov_dec, np.nan)
+    prev[..., 1:] = nov_dec[..., :-1]
+    return jan_feb + prev
+
+
+def climate_factors(tmean: np.ndarray, response: ClimateResponse = ClimateResponse()) -> np.ndarray:
+    """(..., Y, 12) monthly tmean -> (..., Y) yield multipliers in [0, 1]."""
+    gdd = growing_degree_days(tmean, response.gdd_base)
+    chill = chill_days(tmean, response.chill_full, response.chill_zero)
+    factor = np.clip(gdd / response.gdd_target, 0, 1) * np.clip(chill / response.chill_required, 0, 1)
+    return np.where(np.isnan(factor), response.missing_factor, factor).astype(np.float32)
+
+
+def coupled_yields(
+    cube: ClimateCube,
+    params: Union[LifecycleParams, Sequence[LifecycleParams]],
+    planting_year=None,
+    response: ClimateResponse = ClimateResponse(),
+) -> np.ndarray:
+    """
+    Annual yields of trees planted in `planting_year` (scalar or one per params entry;
+    default: the cube's first year) under each station's historical climate.
+
+    Returns float32 of shape (n_stations, n_params, n_years) on the cube's year axis;
+    a single LifecycleParams gives n_params = 1.
+    """
+    params = [params] if isinstance(params, LifecycleParams) else list(params)
+    planting = np.asarray(cube.first_year if planting_year is None else planting_year, dtype=np.float64)
+    ages = cube.years[None, :] - np.broadcast_to(planting, (len(params),))[:, None]   # (T, Y)
+    curves = _yield_curve_arrays(ages, *_params_columns(params)).astype(np.float32)    # (T, Y)
+    factors = climate_factors(cube.data, response)                                     # (S, Y)
+    return curves[None, :, :] * factors[:, None, :]
@@ -0,0 +1,292 @@
+# http_cache.py
+"""
+Persistent on-disk HTTP cache for station downloads.
+
+Each URL is stored as two files named by the SHA-256 of the URL: the body (`.txt`,
+UTF-8) and its metadata (`.json`: URL, ETag, Last-Modified, fetch time and the
+body's SHA-256). Both are written to uniquely named temporary files and renamed, so
+concurrent writers (threads, batch processes) never share a temporary file; as the two
+renames are separate, an entry whose body does not match the hash in its metadata
+is treated as a miss. On every
+request a cached entry is revalidated with If-None-Match / If-Modified-Since, so an
+unchanged file costs a 304 instead of a full download. If the network fails (or the
+server returns 5xx) the cached copy is served stale. The directory is kept under
+`max_bytes` by evicting least recently used entries.
+
+The cache directory defaults to $STATION_CACHE_DIR or ~/.cache/apple_tree_app/stations.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+from perf import PERF
+
+# requests is imported on the first request, not when the app starts
+if TYPE_CHECKING:
+    import requests
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "STATION_CACHE_DIR", str(Path.home() / ".cache" / "apple_tree_app" / "stations")
+)
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+
+
+class DiskHTTPCache:
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        # downloaded: full 200 responses, revalidated: 304s served from disk,
+        # stale: cached copy served because the request failed
+        self.stats: Dict[str, int] = {"downloaded": 0, "revalidated": 0, "stale": 0}
+
+    # ---------- storage ----------
+    def _paths(self, url: str) -> Tuple[Path, Path]:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return self.directory / f"{key}.txt", self.directory / f"{key}.json"
+
+    def _load(self, url: str) -> Tuple[Optional[str], Dict[str, str]]:
+        body_path, meta_path = self._paths(url)
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            raw = body_path.read_bytes()
+        except (OSError, ValueError):
+            return None, {}
+        # Body and metadata are replaced one after the other: a pair from different writes is a miss
+        if meta.get("url") != url or meta.get("sha256") != hashlib.sha256(raw).hexdigest():
+            return None, {}
+        return raw.decode("utf-8"), meta
+
+    def _store(self, url: str, body: str, etag: Optional[str], last_modified: Optional[str]) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        body_path, meta_path = self._paths(url)
+        raw = body.encode("utf-8")
+        meta = {
+            "url": url, "etag": etag, "last_modified": last_modified, "fetched_at": time.time(),
+            "sha256": hashlib.sha256(raw).hexdigest(),
+        }
+        # Write to unique temporary names then rename, so neither a crash nor a concurrent
+        # writer of the same URL leaves a torn file
+        for path, content in ((body_path, raw), (meta_path, json.dumps(meta).encode("utf-8"))):
+            fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=path.name + ".", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(content)
+                os.replace(tmp, path)
+            except BaseException:
+                try:
+                    os.unlink(tmp)
+                except OSError:
+                    pass
+                raise
+        self._evict()
+
+    def _touch(self, url: str) -> None:
+        body_path, _ = self._paths(url)
+        try:
+            os.utime(body_path)
+        except OSError:
+            pass
+
+    def _evict(self) -> None:
+        """Drop least recently used entries (body mtime) until under max_bytes."""
+        entries = []
+        for body_path in self.directory.glob("*.txt"):
+            try:
+                st = body_path.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, body_path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, body_path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            for path in (body_path, body_path.with_suffix(".json")):
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+            total -= size
+
+    def size_bytes(self) -> int:
+        return sum(p.stat().st_size for p in self.directory.glob("*.txt")) if self.directory.exists() else 0
+
+    def clear(self) -> None:
+        for path in list(self.directory.glob("*.txt")) + list(self.directory.glob("*.json")):
+            path.unlink(missing_ok=True)
+
+    # ---------- HTTP ----------
+    def get_text(
+        self,
+        url: str,
+        timeout: float = 30,
+        headers: Optional[Dict[str, str]] = None,
+        session: Optional["requests.Session"] = None,
+    ) -> str:
+        """GET `url` through the cache and return the body text."""
+        with PERF.span("http.get", url=url):
+            return self._get_text(url, timeout, headers, session)
+
+    def _get_text(self, url: str, timeout: float, headers: Optional[Dict[str, str]], session) -> str:
+        import requests
+        cached, meta = self._load(url)
+        req_headers = dict(headers or {})
+        if cached is not None:
+            if meta.get("etag"):
+                req_headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                req_headers["If-Modified-Since"] = meta["last_modified"]
+
+        PERF.count("http.requests")
+        try:
+            r = (session or requests).get(url, timeout=timeout, headers=req_headers)
+        except requests.RequestException:
+            if cached is None:
+                raise
+            self.stats["stale"] += 1
+            PERF.count("http.stale")
+            return cached
+
+        if r.status_code == 304 and cached is not None:
+            self.stats["revalidated"] += 1
+            PERF.count("http.cache_hits")
+            self._touch(url)
+            return cached
+        if r.status_code >= 500 and cached is not None:
+            self.stats["stale"] += 1
+            PERF.count("http.stale")
+            return cached
+        r.raise_for_status()
+
+        text = r.text
+        self.stats["downloaded"] += 1
+        PERF.count("http.bytes_downloaded", len(r.content))
+        try:
+            self._store(url, text, r.headers.get("ETag"), r.headers.get("Last-Modified"))
+        except OSError:
+            pass  # read-only or full disk: still return the fresh body
+        return text
+
+
+# ---------------- Self-checks ----------------
+def check_http_cache() -> None:
+    """
+    Exercise the cache against a local http.server: 200 download, 304 revalidation,
+    a changed body, stale copies on 503 and on a refused connection (errors when
+    nothing is cached), and LRU eviction under max_bytes. Raises AssertionError on
+    a failure. Also checks that concurrent writers of one URL never leave a torn entry.
+    Run with `python http_cache.py`.
+    """
+    import http.server
+    import tempfile
+    import threading
+
+    import requests
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        files: Dict[str, bytes] = {}
+        status: Optional[int] = None       # forced status (e.g. 503) instead of the file
+        seen = []                          # (path, If-None-Match) per request
+
+        def do_GET(self):
+            Handler.seen.append((self.path, self.headers.get("If-None-Match")))
+            body = Handler.files.get(self.path)
+            if Handler.status is not None or body is None:
+                self.send_response(Handler.status or 404); self.end_headers(); return
+            etag = '"%s"' % hashlib.sha256(body).hexdigest()[:16]
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304); self.end_headers(); return
+            self.send_response(200)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Type", "text/plain; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = DiskHTTPCache(tmp, max_bytes=10_000)
+        url = base + "/a.txt"
+
+        # 200, then 304 with the stored validator
+        Handler.files["/a.txt"] = b"v1\n"
+        assert cache.get_text(url) == "v1\n" and cache.stats["downloaded"] == 1
+        assert cache.get_text(url) == "v1\n" and cache.stats["revalidated"] == 1
+        assert Handler.seen[-1][1] is not None, "cached entry was not revalidated conditionally"
+
+        # Changed on the server: a fresh 200 replaces the entry
+        Handler.files["/a.txt"] = b"v2\n"
+        assert cache.get_text(url) == "v2\n" and cache.stats["downloaded"] == 2
+
+        # 5xx: stale copy if cached, HTTPError if not
+        Handler.status = 503
+        assert cache.get_text(url) == "v2\n" and cache.stats["stale"] == 1
+        try:
+            cache.get_text(base + "/uncached.txt")
+            raise AssertionError("503 without a cached copy should raise")
+        except requests.HTTPError:
+            pass
+        Handler.status = None
+
+        # Connection refused: stale copy if cached, the error if not
+        server.shutdown()
+        server.server_close()
+        assert cache.get_text(url, timeout=2) == "v2\n" and cache.stats["stale"] == 2
+        try:
+            cache.get_text(base + "/uncached.txt", timeout=2)
+            raise AssertionError("a refused connection without a cached copy should raise")
+        except requests.ConnectionError:
+            pass
+
+        # Concurrent writers of one URL: every read sees a complete body from one write
+        # (or a miss, when body and metadata come from different writes)
+        cache = DiskHTTPCache(str(Path(tmp) / "concurrent"))
+        bodies = {("%d\n" % i) * (20_000 + i) for i in range(4)}
+        errors: list = []
+
+        def write_and_read(body: str) -> None:
+            try:
+                for _ in range(25):
+                    cache._store(url, body, None, None)
+                    got, _ = cache._load(url)
+                    if got is not None and got not in bodies:
+                        errors.append("torn body")
+            except OSError as ex:
+                errors.append(repr(ex))
+
+        writers = [threading.Thread(target=write_and_read, args=(b,)) for b in bodies]
+        for t in writers:
+            t.start()
+        for t in writers:
+            t.join()
+        assert not errors, f"concurrent writers: {errors[:3]} ({len(errors)} errors)"
+        assert cache._load(url)[0] in bodies | {None}
+        assert not list(cache.directory.glob("*.tmp")), "temporary files left behind"
+
+        # Eviction: oldest bodies (by mtime) go first until the directory fits max_bytes
+        cache = DiskHTTPCache(tmp, max_bytes=3_500)
+        cache.clear()
+        now = time.time()
+        for i, name in enumerate(("old", "mid", "new")):
+            cache._store(f"{base}/{name}.txt", "x" * 1_000, None, None)
+            os.utime(cache._paths(f"{base}/{name}.txt")[0], (now - 100 + i, now - 100 + i))
+        cache._store(f"{base}/newest.txt", "x" * 1_000, None, None)
+        kept = {name for name in ("old", "mid", "new", "newest") if cache._load(f"{base}/{name}.txt")[0] is not None}
+        assert kept == {"mid", "new", "newest"}, f"eviction kept {sorted(kept)}"
+        assert cache.size_bytes() <= cache.max_bytes
+        assert not list(Path(tmp).glob("*.tmp")), "temporary files left behind"
+
+
+if __name__ == "__main__":
+    check_http_cache()
+    print("http_cache: 200/304/changed/503/refused/concurrent/eviction checks passed")
@@ -0,0 +1,343 @@
+# optimise.py
+"""
+Optimise lifecycle and replanting decisions for discounted orchard output.
+
+A decision is a set of LifecycleParams fields plus the replanting policy of
+`rotation.Cohort` (`replant` 0/1 and `replant_gap` fallow years), e.g. choosing the
+removal age `end_year`. `OrchardObjective` scores a whole population of decisions in
+one vectorized pass: the discounted yield of one orchard spot over a finite horizon,
+with each rotation's contribution read from a prefix sum of the discounted curve, less
+an optional cost per replanting.
+
+Three search strategies share one batch evaluator (in-process, or chunks spread over
+a ProcessPoolExecutor that lives for the whole search):
+- `grid_search`: exhaustive Cartesian product, streamed in batches
+- `random_search`: uniform samples within bounds
+- `differential_evolution`: derivative-free population search (DE/rand/1/bin)
+
+All three stop early after `patience` batches/generations without an improvement of
+more than `tol`, or when `callback(progress)` returns True, and record best-so-far
+`Progress` after every batch.
+
+Example:
+    obj = OrchardObjective(horizon=200, rate=0.03, replant_cost=50)
+    res = differential_evolution(obj, {"end_year": (45, 120), "replant_gap": (0, 5)}, seed=1)
+    res.best, res.best_value, res.to_cohort()
+"""
+
+import itertools
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, replace
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from apple_tree_sim import LifecycleParams, _yield_curve_arrays
+from rotation import Cohort
+from sweep import INT_FIELDS, PARAM_FIELDS, worker_count
+
+POLICY_FIELDS = ("replant", "replant_gap")
+DECISION_INT_FIELDS = INT_FIELDS | set(POLICY_FIELDS)
+
+
+@dataclass(frozen=True)
+class OrchardObjective:
+    base: LifecycleParams = field(default_factory=LifecycleParams)
+    horizon: int = 200               # years from the first planting
+    rate: float = 0.03               # annual discount rate
+    replant_cost: float = 0.0        # cost per replanting, in discounted yield units
+    replant: bool = True             # default policy when not a decision variable
+    replant_gap: int = 0
+
+    def __call__(self, names: Sequence[str], X: np.ndarray) -> np.ndarray:
+        """
+        Discounted output of each row of X (n, len(names)); invalid decisions (phase
+        boundaries out of order) score -inf.
+        """
+        X = np.asarray(X, dtype=np.float64).reshape(-1, len(names))
+        n = len(X)
+        col = {name: X[:, i] for i, name in enumerate(names)}
+        unknown = set(col) - set(PARAM_FIELDS) - set(POLICY_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown decision variables {sorted(unknown)}; expected LifecycleParams fields or {POLICY_FIELDS}.")
+        p = {f: col.get(f, np.full(n, float(getattr(self.base, f)))) for f in PARAM_FIELDS}
+        replant = col.get("replant", np.full(n, float(self.replant))) > 0.5
+        gap = np.maximum(col.get("replant_gap", np.full(n, float(self.replant_gap))), 0)
+
+        end = p["end_year"]
+        valid = ((0 < p["juvenile_years"]) & (p["juvenile_years"] <= p["exp_start_year"])
+                 & (p["exp_start_year"] < p["plateau_start_year"])
+                 & (p["plateau_start_year"] < p["decline_start_year"])
+                 & (p["decline_start_year"] < end))
+
+        # S[i, m]: discounted yield of decision i over ages 0..m-1
+        n_ages = int(min(max(end.max(initial=1), 1), self.horizon))
+        ages = np.arange(n_ages, dtype=np.float64)
+        disc = (1.0 + self.rate) ** -ages
+        curves = _yield_curve_arrays(ages[None, :], *(p[f][:, None] for f in PARAM_FIELDS))
+        S = np.zeros((n, n_ages + 1))
+        np.cumsum(curves * disc, axis=1, out=S[:, 1:])
+
+        # Rotation k starts at k * period and runs for min(end, horizon - start) years
+        period = np.where(replant, end + gap, np.inf)
+        n_rot = int(np.ceil(self.horizon / np.maximum(period[valid], 1).min(initial=np.inf))) if replant[valid].any() else 1
+        with np.errstate(invalid="ignore"):
+            start = np.arange(n_rot)[None, :] * period[:, None]
+        start[:, 0] = 0.0
+        active = start < self.horizon
+        length = np.where(active, np.clip(self.horizon - start, 0, end[:, None]), 0).astype(np.int64)
+        start_disc = np.where(active, (1.0 + self.rate) ** -np.where(active, start, 0), 0.0)
+        value = (start_disc * np.take_along_axis(S, np.minimum(length, n_ages), axis=1)).sum(axis=1)
+        value -= self.replant_cost * start_disc[:, 1:].sum(axis=1)
+        return np.where(valid, value, -np.inf)
+
+
+def _evaluate_chunk(objective: Callable, names: Sequence[str], X: np.ndarray) -> np.ndarray:
+    return objective(names, X)
+
+
+class BatchEvaluator:
+    """
+    Score candidate populations, split into about one chunk per worker over a process
+    pool (populations of at most `min_chunk_size` rows are scored in-process).
+    Use as a context manager so the pool is created once per search.
+    """
+
+    def __init__(self, objective: Callable, names: Sequence[str], max_workers: Optional[int] = None, min_chunk_size: int = 32):
+        self.objective = objective
+        self.names = tuple(names)
+        self.max_workers = worker_count(max_workers)
+        self.min_chunk_size = min_chunk_size
+        self.evaluations = 0
+        self.pool_chunks = 0             # chunks scored by worker processes
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def __enter__(self) -> "BatchEvaluator":
+        if self.max_workers > 1:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __call__(self, X: np.ndarray) -> np.ndarray:
+        self.evaluations += len(X)
+        if self._pool is None or len(X) <= self.min_chunk_size:
+            return _evaluate_chunk(self.objective, self.names, X)
+        size = max(self.min_chunk_size, -(-len(X) // self.max_workers))
+        parts = [X[i:i + size] for i in range(0, len(X), size)]
+        self.pool_chunks += len(parts)
+        return np.concatenate(list(self._pool.map(_evaluate_chunk, itertools.repeat(self.objective), itertools.repeat(self.names), parts)))
+
+
+# ---------------- Results ----------------
+@dataclass
+class Progress:
+    iteration: int                   # batch or generation number
+    evaluations: int
+    best_value: float
+    best: Dict[str, float]
+    elapsed: float                   # seconds since the search started
+
+
+@dataclass
+class OptimizeResult:
+    best: Dict[str, float]
+    best_value: float
+    evaluations: int
+    history: List[Progress]
+    stopped_early: bool
+
+    def to_cohort(self, planting_year: int = 0, base: Optional[LifecycleParams] = None, trees: float = 1.0) -> Cohort:
+        """The best decision as a rotation Cohort (policy fields default to Cohort's)."""
+        params = replace(base or LifecycleParams(), **{k: v for k, v in self.best.items() if k in PARAM_FIELDS})
+        policy = {k: v for k, v in self.best.items() if k in POLICY_FIELDS}
+        if "replant" in policy:
+            policy["replant"] = bool(policy["replant"])
+        return Cohort(planting_year, trees=trees, params=params, **policy)
+
+
+class _Tracker:
+    """Best-so-far bookkeeping and early stopping shared by the search strategies."""
+
+    def __init__(self, names: Sequence[str], patience: Optional[int], tol: float,
+                 callback: Optional[Callable[[Progress], Optional[bool]]]):
+        self.names = tuple(names)
+        self.patience, self.tol, self.callback = patience, tol, callback
+        self.best_value = -np.inf
+        self.best: Dict[str, float] = {}
+        self.history: List[Progress] = []
+        self.stale = 0
+        self.t0 = time.perf_counter()
+
+    def _decode(self, x: np.ndarray) -> Dict[str, float]:
+        return {n: int(v) if n in DECISION_INT_FIELDS else float(v) for n, v in zip(self.names, x)}
+
+    def update(self, X: np.ndarray, values: np.ndarray, evaluations: int) -> bool:
+        """Record one batch; returns True if the search should stop."""
+        i = int(np.argmax(values)) if len(values) else -1
+        if i >= 0 and values[i] > self.best_value + self.tol:
+            self.best_value, self.best, self.stale = float(values[i]), self._decode(X[i]), 0
+        else:
+            self.stale += 1
+        prog = Progress(len(self.history), evaluations, self.best_value, dict(self.best), time.perf_counter() - self.t0)
+        self.history.append(prog)
+        if self.callback is not None and self.callback(prog):
+            return True
+        return self.patience is not None and self.stale >= self.patience
+
+    def result(self, evaluations: int, stopped: bool) -> OptimizeResult:
+        return OptimizeResult(self.best, self.best_value, evaluations, self.history, stopped)
+
+
+def _round_ints(names: Sequence[str], X: np.ndarray) -> np.ndarray:
+    for j, name in enumerate(names):
+        if name in DECISION_INT_FIELDS:
+            X[:, j] = np.rint(X[:, j])
+    return X
+
+
+def _run_batches(objective, names, batches: Iterable[np.ndarray], max_workers, patience, tol, callback) -> OptimizeResult:
+    tracker = _Tracker(names, patience, tol, callback)
+    stopped = False
+    with BatchEvaluator(objective, names, max_workers) as evaluate:
+        for X in batches:
+            if tracker.update(X, evaluate(X), evaluate.evaluations):
+                stopped = True
+                break
+    return tracker.result(evaluate.evaluations, stopped)
+
+
+# ---------------- Strategies ----------------
+def grid_search(
+    objective: Callable,
+    axes: Dict[str, Sequence[float]],
+    batch_size: int = 10_000,
+    max_workers: Optional[int] = 1,
+    patience: Optional[int] = None,
+    tol: float = 0.0,
+    callback: Optional[Callable[[Progress], Optional[bool]]] = None,
+) -> OptimizeResult:
+    """Evaluate the Cartesian product of `axes`, streamed in batches of `batch_size`."""
+    names = list(axes)
+    combos = itertools.product(*(axes[n] for n in names))
+
+    def batches() -> Iterator[np.ndarray]:
+        while True:
+            block = list(itertools.islice(combos, batch_size))
+            if not block:
+                return
+            yield np.array(block, dtype=np.float64)
+
+    return _run_batches(objective, names, batches(), max_workers, patience, tol, callback)
+
+
+def random_search(
+    objective: Callable,
+    bounds: Dict[str, Tuple[float, float]],
+    n: int = 10_000,
+    batch_size: int = 2000,
+    seed: Optional[int] = None,
+    max_workers: Optional[int] = 1,
+    patience: Optional[int] = None,
+    tol: float = 0.0,
+    callback: Optional[Callable[[Progress], Optional[bool]]] = None,
+) -> OptimizeResult:
+    """Up to n uniform draws within `bounds` (integer variables rounded)."""
+    names = list(bounds)
+    lo, hi = (np.array([bounds[k][i] for k in names], dtype=np.float64) for i in (0, 1))
+    rng = np.random.default_rng(seed)
+
+    def batches() -> Iterator[np.ndarray]:
+        for start in range(0, n, batch_size):
+            m = min(batch_size, n - start)
+            yield _round_ints(names, rng.uniform(lo, hi, size=(m, len(names))))
+
+    return _run_batches(objective, names, batches(), max_workers, patience, tol, callback)
+
+
+def differential_evolution(
+    objective: Callable,
+    bounds: Dict[str, Tuple[float, float]],
+    popsize: int = 200,
+    generations: int = 100,
+    mutation: float = 0.7,
+    crossover: float = 0.9,
+    seed: Optional[int] = None,
+    max_workers: Optional[int] = 1,
+    patience: Optional[int] = 15,
+    tol: float = 1e-9,
+    callback: Optional[Callable[[Progress], Optional[bool]]] = None,
+) -> OptimizeResult:
+    """
+    DE/rand/1/bin maximisation: each generation builds one trial per member from
+    three others, scores the whole trial population as one batch and keeps whichever
+    of member and trial is better. Integer variables are searched on a rounded grid.
+    """
+    names = list(bounds)
+    d = len(names)
+    lo, hi = (np.array([bounds[k][i] for k in names], dtype=np.float64) for i in (0, 1))
+    rng = np.random.default_rng(seed)
+    popsize = max(popsize, 4)
+    tracker = _Tracker(names, patience, tol, callback)
+    stopped = False
+
+    with BatchEvaluator(objective, names, max_workers) as evaluate:
+        pop = _round_ints(names, rng.uniform(lo, hi, size=(popsize, d)))
+        fit = evaluate(pop)
+        stopped = tracker.update(pop, fit, evaluate.evaluations)
+        for _ in range(generations):
+            if stopped:
+                break
+            # Three distinct partners per member, none equal to the member itself
+            idx = np.argsort(rng.random((popsize, popsize - 1)), axis=1)[:, :3]
+            idx += idx >= np.arange(popsize)[:, None]
+            a, b, c = pop[idx[:, 0]], pop[idx[:, 1]], pop[idx[:, 2]]
+            mutant = np.clip(a + mutation * (b - c), lo, hi)
+            cross = rng.random((popsize, d)) < crossover
+            cross[np.arange(popsize), rng.integers(0, d, popsize)] = True
+            trial = _round_ints(names, np.where(cross, mutant, pop))
+
+            trial_fit = evaluate(trial)
+            better = trial_fit >= fit
+            pop[better], fit[better] = trial[better], trial_fit[better]
+            stopped = tracker.update(trial, trial_fit, evaluate.evaluations)
+
+    return tracker.result(evaluate.evaluations, stopped)
+
+
+# ---------------- Self-checks ----------------
+def check_batch_evaluator(max_workers: int = 2) -> None:
+    """
+    A default-size random_search batch (and a DE population) is split across the
+    worker processes, and pooled scores equal in-process ones. Raises AssertionError
+    on a failure. Run with `python optimise.py`.
+    """
+    import inspect
+
+    obj = OrchardObjective(horizon=150, replant_cost=20)
+    names = ["end_year", "replant_gap"]
+    rng = np.random.default_rng(0)
+    sizes = {
+        "random_search": inspect.signature(random_search).parameters["batch_size"].default,
+        "differential_evolution": inspect.signature(differential_evolution).parameters["popsize"].default,
+    }
+    for strategy, size in sizes.items():
+        X = np.column_stack([rng.integers(85, 160, size), rng.integers(0, 6, size)]).astype(np.float64)
+        with BatchEvaluator(obj, names, max_workers=max_workers) as evaluate:
+            pooled = evaluate(X)
+            assert evaluate.pool_chunks == max_workers, f"{strategy}: {evaluate.pool_chunks} chunks sent to workers"
+        assert np.array_equal(pooled, obj(names, X)), f"{strategy}: pooled scores differ"
+
+    bounds = {"end_year": (85, 160), "replant_gap": (0, 5)}
+    serial = random_search(obj, bounds, n=4000, seed=1, max_workers=1)
+    pooled = random_search(obj, bounds, n=4000, seed=1, max_workers=max_workers)
+    assert (serial.best, serial.best_value) == (pooled.best, pooled.best_value)
+
+
+if __name__ == "__main__":
+    check_batch_evaluator()
+    print("optimise: batches are split across worker processes")
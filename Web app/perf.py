@@ -0,0 +1,227 @@
+# perf.py
+"""
+Lightweight timing spans and counters for the app's hot paths.
+
+    from perf import PERF
+
+    with PERF.span("http.get", url=url):
+        ...
+    PERF.count("http.bytes", len(body))
+
+    @PERF.timed("store.update")
+    def update(self, station, text): ...
+
+`PERF` records into the *current* Recorder, held in a context variable. By default
+that is one process-wide recorder (enabled with PERF_TRACE=1), which is what scripts
+and benchmarks use. `recording()` installs a fresh recorder for a block of code in
+the current context only; the app wraps each rerun in it, so concurrent Streamlit
+sessions (each on its own thread) never mix or reset each other's spans:
+
+    with recording(enabled=True) as rec:
+        ...
+    rec.summary()
+
+When the current recorder is disabled `span()` returns a shared no-op context
+manager and `count()` returns after one attribute check, so instrumented code costs a
+few hundred nanoseconds per call.
+
+Spans nest per thread. Work handed to a thread pool records into the submitting
+rerun's recorder when submitted through `contextvars.copy_context().run` (as
+`load_stations` does); the worker threads keep their own depth. Records are exported
+as JSON lines, one object per span and per counter, tagged with the run id, for
+offline analysis (pandas.read_json(..., lines=True)). With PERF_TRACE_FILE set, the
+app appends every instrumented rerun to that file.
+"""
+
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("rec", "name", "attrs", "t0", "depth")
+
+    def __init__(self, rec: "Recorder", name: str, attrs: Dict):
+        self.rec, self.name, self.attrs = rec, name, attrs
+
+    def __enter__(self):
+        local = self.rec._local
+        self.depth = getattr(local, "depth", 0)
+        local.depth = self.depth + 1
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        t1 = time.perf_counter()
+        self.rec._local.depth = self.depth
+        record = {
+            "type": "span",
+            "name": self.name,
+            "start_ms": (self.t0 - self.rec._t0) * 1e3,
+            "ms": (t1 - self.t0) * 1e3,
+            "depth": self.depth,
+            "thread": threading.current_thread().name,
+        }
+        if exc_type is not None:
+            record["error"] = exc_type.__name__
+        if self.attrs:
+            record.update(self.attrs)
+        with self.rec._lock:
+            self.rec.spans.append(record)
+        return False
+
+
+class Recorder:
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self) -> None:
+        """Start a new run: drop recorded spans and counters."""
+        self.run_id = uuid.uuid4().hex[:12]
+        self._t0 = time.perf_counter()
+        self.started_at = time.time()
+        self.spans: List[Dict] = []
+        self.counters: Dict[str, float] = defaultdict(float)
+
+    # ---------- recording ----------
+    def span(self, name: str, **attrs):
+        """Context manager timing the enclosed block (no-op when disabled)."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, attrs)
+
+    def count(self, name: str, n: float = 1) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] += n
+
+    def timed(self, name: Optional[str] = None) -> Callable:
+        """Decorator: time every call of the function as a span."""
+        def wrap(fn):
+            label = name or fn.__qualname__
+
+            @functools.wraps(fn)
+            def inner(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                with _Span(self, label, {}):
+                    return fn(*args, **kwargs)
+            return inner
+        return wrap
+
+    # ---------- reporting ----------
+    def summary(self) -> List[Dict]:
+        """Per span name: calls, total and max milliseconds (order of first occurrence)."""
+        out: Dict[str, Dict] = {}
+        with self._lock:
+            spans = list(self.spans)
+        for s in spans:
+            row = out.setdefault(s["name"], {"name": s["name"], "calls": 0, "total_ms": 0.0, "max_ms": 0.0})
+            row["calls"] += 1
+            row["total_ms"] += s["ms"]
+            row["max_ms"] = max(row["max_ms"], s["ms"])
+        return list(out.values())
+
+    def records(self) -> Iterable[Dict]:
+        with self._lock:
+            spans, counters = list(self.spans), dict(self.counters)
+        base = {"run": self.run_id, "time": self.started_at}
+        for s in spans:
+            yield {**base, **s}
+        for name, value in counters.items():
+            yield {**base, "type": "counter", "name": name, "value": value}
+
+    def to_jsonl(self) -> str:
+        return "".join(json.dumps(r, default=str) + "\n" for r in self.records())
+
+    def export(self, path: str) -> None:
+        """Append this run's records to a JSON-lines file."""
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(self.to_jsonl())
+
+
+# ---------------- Current recorder ----------------
+PERF_TRACE = os.environ.get("PERF_TRACE", "") not in ("", "0")
+PERF_TRACE_FILE = os.environ.get("PERF_TRACE_FILE") or None
+
+_PROCESS_RECORDER = Recorder(enabled=PERF_TRACE)
+_CURRENT: contextvars.ContextVar[Recorder] = contextvars.ContextVar("perf_recorder", default=_PROCESS_RECORDER)
+
+
+def current() -> Recorder:
+    """The recorder instrumented code writes to in this context."""
+    return _CURRENT.get()
+
+
+@contextmanager
+def recording(enabled: bool = True) -> Iterator[Recorder]:
+    """Record the enclosed block into a new Recorder, visible only in this context."""
+    rec = Recorder(enabled=enabled)
+    token = _CURRENT.set(rec)
+    try:
+        yield rec
+    finally:
+        _CURRENT.reset(token)
+
+
+class _CurrentRecorder:
+    """Module-level entry point: forwards to whichever Recorder is current."""
+
+    __slots__ = ()
+
+    def span(self, name: str, **attrs):
+        rec = _CURRENT.get()
+        if not rec.enabled:
+            return _NULL_SPAN
+        return _Span(rec, name, attrs)
+
+    def count(self, name: str, n: float = 1) -> None:
+        rec = _CURRENT.get()
+        if rec.enabled:
+            rec.count(name, n)
+
+    def timed(self, name: Optional[str] = None) -> Callable:
+        """Decorator: time every call of the function as a span of the current recorder."""
+        def wrap(fn):
+            label = name or fn.__qualname__
+
+            @functools.wraps(fn)
+            def inner(*args, **kwargs):
+                rec = _CURRENT.get()
+                if not rec.enabled:
+                    return fn(*args, **kwargs)
+                with _Span(rec, label, {}):
+                    return fn(*args, **kwargs)
+            return inner
+        return wrap
+
+    def __getattr__(self, attr: str):
+        # enabled, summary(), to_jsonl(), ... of the current recorder
+        return getattr(_CURRENT.get(), attr)
+
+
+PERF = _CurrentRecorder()
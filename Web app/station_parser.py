@@ -0,0 +1,461 @@
+# station_parser.py
+"""
+Single-pass streaming parser for Met Office station files.
+
+`StationParser` is a small state machine fed one line at a time (str or bytes, or raw
+byte chunks via `feed_bytes`), so it can consume a download as it arrives. It
+recognises both layouts handled by app.py in the same pass:
+- 'mm' long tables: a header such as `yyyy mm tmax tmin ...`, one row per month
+- wide tables: `Year JAN .. DEC` (or `Year 1 .. 12`), one row per year
+
+Values are appended straight into typed column buffers (`array.array`, exposed to
+NumPy without copying) instead of lists of Optional[float] and per-table DataFrames.
+Token rules and tmax/tmin labelling follow `_token_to_float`, `_parse_mm_table` and
+`_label_from_wide` of the original parser (kept in station_parser_legacy); the one
+difference is that an 'mm' header inside a wide table ends that table rather than
+being scanned by both.
+
+Run this file to check it against the original parser (`check_station_parser`) and
+benchmark both on synthetic 1x and 100x files.
+"""
+
+import re
+from array import array
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+
+import numpy as np
+
+from perf import PERF
+
+LEADING_NUM_RE = re.compile(r"^(-?\d+(?:\.\d+)?)")
+
+JAN_DEC = ["JAN","FEB","MAR","APR","MAY","JUN","JUL","AUG","SEP","OCT","NOV","DEC"]
+NUM_1_12 = [str(i) for i in range(1,13)]
+
+YEAR_NAMES = ("year", "yyyy", "yr")
+MONTH_NAMES = ("mm", "month")
+TMAX_NAMES = ("tmax", "tx", "tmax(degc)", "tmax(c)", "maxtemp", "tmax_c")
+TMIN_NAMES = ("tmin", "tn", "tmin(degc)", "tmin(c)", "mintemp", "tmin_c")
+
+# (years, months, values)
+SeriesArrays = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+def _slow_token(t: str) -> Optional[float]:
+    """Same rules as station_parser_legacy._token_to_float for tokens that are not plain numbers."""
+    if not t or t == "---":
+        return float("nan")
+    tl = t.lower()
+    if tl == "ann" or tl.startswith("provisional"):
+        return None
+    m = LEADING_NUM_RE.match(t)
+    return float(m.group(1)) if m else None
+
+
+def _token(t: str) -> Optional[float]:
+    # Fast path for plain numbers ('12', '-3.4'); flags ('12.3*'), '---' etc. take the slow path
+    body = t[1:] if t[:1] == "-" else t
+    if body[:1].isdigit() and body.replace(".", "", 1).isdigit():
+        return float(t)
+    return _slow_token(t)
+
+
+def _first_index(col_index: Dict[str, int], names: Iterable[str]) -> Optional[int]:
+    for nm in names:
+        if nm in col_index:
+            return col_index[nm]
+    return None
+
+
+class _Series:
+    """Growable typed (Year, Month, value) columns."""
+
+    __slots__ = ("years", "months", "values")
+
+    def __init__(self):
+        self.years = array("h")
+        self.months = array("b")
+        self.values = array("d")
+
+    def append(self, year: int, month: int, value: float) -> None:
+        self.years.append(year)
+        self.months.append(month)
+        self.values.append(value)
+
+    def extend(self, other: "_Series") -> None:
+        self.years.extend(other.years)
+        self.months.extend(other.months)
+        self.values.extend(other.values)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def arrays(self) -> SeriesArrays:
+        return (
+            np.frombuffer(self.years, dtype=np.int16) if self.years else np.empty(0, np.int16),
+            np.frombuffer(self.months, dtype=np.int8) if self.months else np.empty(0, np.int8),
+            np.frombuffer(self.values, dtype=np.float64) if self.values else np.empty(0, np.float64),
+        )
+
+
+class StationParser:
+    """Feed lines (or byte chunks), then call `labeled()` for tmax/tmin series."""
+
+    def __init__(self, encoding: str = "utf-8", min_month_index: Optional[int] = None):
+        self.encoding = encoding
+        # Rows for months before this index (year * 12 + month - 1) are skipped before
+        # their values are converted; used for incremental updates (station_store)
+        self.min_month_index = min_month_index
+        self.lines_seen = 0
+        self.provisional: Set[int] = set()   # month indices of rows marked 'Provisional'
+        self.mm: Dict[str, _Series] = {"tmax": _Series(), "tmin": _Series()}
+        self.wide: List[_Series] = []
+        self._state = None          # None | "mm" | "wide"
+        self._pending = b""         # partial line carried between feed_bytes chunks
+        # current 'mm' table
+        self._year_col = self._mm_col = 0
+        self._tmax_col: Optional[int] = None
+        self._tmin_col: Optional[int] = None
+        self._unnamed_rows: List[Tuple[int, int, List[Optional[float]]]] = []
+
+    # ---------- input ----------
+    def feed(self, line: Union[str, bytes]) -> None:
+        if isinstance(line, bytes):
+            line = line.decode(self.encoding, errors="replace")
+        self.lines_seen += 1
+        parts = line.split()
+        if not parts:
+            self._end_table()
+            return
+        first = parts[0]
+        if not first[0].isdigit():
+            low = [p.lower() for p in parts]
+            if low[0] == "year" and len(parts) >= 13 and [p.upper() for p in parts[1:13]] in (JAN_DEC, NUM_1_12):
+                self._end_table()
+                self._state = "wide"
+                self.wide.append(_Series())
+                return
+            if "mm" in low and any(y in low for y in YEAR_NAMES):
+                self._end_table()
+                self._start_mm(low)
+                return
+        if self._state == "mm":
+            self._mm_row(parts)
+        elif self._state == "wide" and len(first) == 4 and first.isdigit():
+            self._wide_row(parts)
+
+    def feed_lines(self, lines: Iterable[Union[str, bytes]]) -> "StationParser":
+        for line in lines:
+            self.feed(line)
+        return self
+
+    def feed_bytes(self, chunk: bytes) -> None:
+        """Feed an arbitrary slice of the byte stream (e.g. from `iter_content`)."""
+        data = self._pending + chunk
+        *complete, self._pending = data.split(b"\n")
+        for line in complete:
+            self.feed(line)
+
+    def close(self) -> "StationParser":
+        if self._pending:
+            self.feed(self._pending)
+            self._pending = b""
+        self._end_table()
+        return self
+
+    # ---------- table handling ----------
+    def _start_mm(self, header: List[str]) -> None:
+        col_index = {name: idx for idx, name in enumerate(header)}
+        self._year_col = _first_index(col_index, YEAR_NAMES)
+        self._mm_col = _first_index(col_index, MONTH_NAMES)
+        self._tmax_col = _first_index(col_index, TMAX_NAMES)
+        self._tmin_col = _first_index(col_index, TMIN_NAMES)
+        self._unnamed_rows = []
+        self._state = "mm"
+
+    def _mm_row(self, parts: List[str]) -> None:
+        yc, mc = self._year_col, self._mm_col
+        if len(parts) <= max(yc, mc):
+            return
+        try:
+            year = int(parts[yc]); mm = int(parts[mc])
+        except ValueError:
+            return
+        if not (1 <= mm <= 12) or not (-32768 <= year <= 32767):  # years are stored as int16
+            return
+        month_index = year * 12 + mm - 1
+        if self.min_month_index is not None and month_index < self.min_month_index:
+            return
+        if parts[-1].lower().startswith("provisional"):
+            self.provisional.add(month_index)
+
+        tmax_col, tmin_col = self._tmax_col, self._tmin_col
+        if tmax_col is not None and tmin_col is not None:
+            # Tokens are read left to right; an ANN/provisional marker ends the row,
+            # so later columns do not count (as in _parse_mm_table)
+            vmax = vmin = None
+            for idx in range(min(len(parts), max(tmax_col, tmin_col) + 1)):
+                if idx == yc or idx == mc:
+                    continue
+                v = _token(parts[idx])
+                if v is None:
+                    break
+                if idx == tmax_col:
+                    vmax = v
+                elif idx == tmin_col:
+                    vmin = v
+            if vmax is not None:
+                self.mm["tmax"].append(year, mm, vmax)
+            if vmin is not None:
+                self.mm["tmin"].append(year, mm, vmin)
+            return
+
+        # Columns not (fully) named: keep the row until the table ends, then infer
+        row: List[Optional[float]] = [None] * len(parts)
+        for idx, tok in enumerate(parts):
+            if idx in (yc, mc):
+                continue
+            v = _token(tok)
+            if v is None:
+                break
+            row[idx] = v
+        self._unnamed_rows.append((year, mm, row))
+
+    def _wide_row(self, parts: List[str]) -> None:
+        if self.min_month_index is not None and int(parts[0]) * 12 + 11 < self.min_month_index:
+            return
+        vals: List[float] = []
+        for tok in parts[1:13]:
+            v = _token(tok)
+            if v is None:
+                break
+            vals.append(v)
+        if len(vals) == 12:
+            table = self.wide[-1]
+            year = int(parts[0])
+            for m_idx, v in enumerate(vals, start=1):
+                table.append(year, m_idx, v)
+
+    def _end_table(self) -> None:
+        if self._state == "mm" and self._unnamed_rows:
+            self._infer_mm_columns()
+        self._unnamed_rows = []
+        self._state = None
+
+    def _infer_mm_columns(self) -> None:
+        """Most complete two columns; the one with the higher mean is tmax (see _parse_mm_table)."""
+        rows = self._unnamed_rows
+        col_scores: Dict[int, Tuple[int, float]] = {}
+        for _, _, row in rows:
+            for idx, val in enumerate(row):
+                if val is None:
+                    continue
+                cnt, s = col_scores.get(idx, (0, 0.0))
+                col_scores[idx] = (cnt + 1, s + val)
+
+        named = [c for c in (self._tmax_col, self._tmin_col) if c is not None]
+        if len(col_scores) >= 2:
+            cand = sorted(col_scores.items(), key=lambda kv: (-kv[1][0], -kv[1][1]))
+            idx1, (c1, s1) = cand[0]; idx2, (c2, s2) = cand[1]
+            tmax_idx, tmin_idx = (idx1, idx2) if s1 / max(c1, 1) >= s2 / max(c2, 1) else (idx2, idx1)
+            targets = [("tmax", tmax_idx), ("tmin", tmin_idx)]
+        elif named:
+            targets = [("tmax" if c == self._tmax_col else "tmin", c) for c in named]
+        else:
+            return
+        for name, col in targets:
+            series = self.mm[name]
+            for year, mm, row in rows:
+                v = row[col] if col < len(row) else None
+                if v is not None:
+                    series.append(year, mm, v)
+
+    # ---------- output ----------
+    def labeled(self) -> Dict[str, SeriesArrays]:
+        """
+        tmax/tmin series: from 'mm' tables when present, otherwise from the wide tables
+        (lowest mean -> tmin, highest -> tmax), mirroring `_build_tmean_df`.
+        """
+        out: Dict[str, SeriesArrays] = {k: s.arrays() for k, s in self.mm.items() if len(s)}
+        if "tmax" not in out or "tmin" not in out:
+            cands = [(np.nanmean(t.arrays()[2]), t) for t in self.wide if len(t)]
+            if len(cands) >= 2:
+                cands.sort(key=lambda x: x[0])
+                out.setdefault("tmin", cands[0][1].arrays())
+                out.setdefault("tmax", cands[-1][1].arrays())
+        return out
+
+
+def parse_station_lines(lines: Iterable[Union[str, bytes]]) -> Dict[str, SeriesArrays]:
+    """One pass over `lines` (str or bytes); returns {"tmax": ..., "tmin": ...} arrays."""
+    with PERF.span("parse.scan"):
+        parser = StationParser().feed_lines(lines).close()
+        labeled = parser.labeled()
+    PERF.count("parse.lines_scanned", parser.lines_seen)
+    PERF.count("parse.values", sum(len(series[0]) for series in labeled.values()))
+    return labeled
+
+
+def align_months(labeled: Dict[str, SeriesArrays]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Inner-join tmax and tmin on the integer month index (year * 12 + month - 1) instead of
+    a hash merge on (Year, Month). Returns (month_index, tmax, tmin) sorted by month; a
+    month listed twice keeps its first value.
+    """
+    keyed = []
+    for var in ("tmax", "tmin"):
+        years, months, values = labeled[var]
+        idx = years.astype(np.int32) * 12 + months.astype(np.int32) - 1
+        idx, first = np.unique(idx, return_index=True)
+        keyed.append((idx, values[first]))
+    (i_max, v_max), (i_min, v_min) = keyed
+    common, a, b = np.intersect1d(i_max, i_min, assume_unique=True, return_indices=True)
+    return common, v_max[a], v_min[b]
+
+
+def station_frame(
+    month_index: np.ndarray,
+    tmax: np.ndarray,
+    tmin: np.ndarray,
+    start_year: int = 1950,
+    tmean: Optional[np.ndarray] = None,
+):
+    """
+    Station DataFrame (Year, Month, tmax, tmin, tmean, Date) from month-indexed columns.
+
+    Year is int16, Month int8 and temperatures float32 (the files carry 0.1 degC, well
+    inside float32 precision). Date is the month end, computed arithmetically on
+    datetime64[M] rather than via pd.to_datetime + MonthEnd.
+    """
+    import pandas as pd
+
+    month_index = np.asarray(month_index)
+    keep = month_index >= int(start_year) * 12
+    if not keep.any():
+        raise ValueError(f"No monthly records at or after start_year={start_year}.")
+    idx = month_index[keep].astype(np.int64)
+    tmax = np.asarray(tmax)[keep].astype(np.float32)
+    tmin = np.asarray(tmin)[keep].astype(np.float32)
+    tmean = (tmax + tmin) / np.float32(2.0) if tmean is None else np.asarray(tmean)[keep].astype(np.float32)
+
+    month_start = (idx - 1970 * 12).astype("datetime64[M]")
+    month_end = (month_start + 1).astype("datetime64[D]") - np.timedelta64(1, "D")
+    return pd.DataFrame({
+        "Year": (idx // 12).astype(np.int16),
+        "Month": (idx % 12 + 1).astype(np.int8),
+        "tmax": tmax,
+        "tmin": tmin,
+        "tmean": tmean,
+        "Date": month_end.astype("datetime64[ns]"),
+    })
+
+
+def synthetic_station_text(n_years: int = 170, layout: str = "mm", repeats: int = 1, seed: int = 0) -> str:
+    """
+    Generate a Met Office-like station file for benchmarks.
+
+    layout "mm" writes one `yyyy mm tmax tmin af rain sun` table, layout "wide" writes a
+    tmax and a tmin `Year JAN..DEC` table. `repeats` stacks that many copies of the
+    tables (blank-line separated) to scale the file without leaving 4-digit years.
+    """
+    rng = np.random.default_rng(seed)
+    years = range(2024 - n_years, 2024)
+    seasonal = 6.0 * np.sin((np.arange(12) - 3) / 12 * 2 * np.pi)
+    out: List[str] = ["Synthetic station", "Location: synthetic", "Estimated data is marked with a * after the value.", ""]
+    for _ in range(repeats):
+        tmax = 13.0 + seasonal + rng.normal(0, 1.5, (len(years), 12))
+        tmin = 5.0 + seasonal + rng.normal(0, 1.5, (len(years), 12))
+        if layout == "mm":
+            out.append("   yyyy  mm   tmax    tmin      af    rain     sun")
+            out.append("              degC    degC    days      mm   hours")
+            for i, y in enumerate(years):
+                for m in range(12):
+                    flag = "*" if (i + m) % 17 == 0 else ""
+                    af = "---" if (i * 12 + m) % 23 == 0 else str((i + m) % 5)
+                    out.append(f"   {y}  {m + 1:2d}  {tmax[i, m]:5.1f}{flag}  {tmin[i, m]:5.1f}  {af:>6}  {50 + (m * 7) % 40:6.1f}  {100 + m:6.1f}")
+        elif layout == "wide":
+            for title, data in (("Mean maximum temperature (degC)", tmax), ("Mean minimum temperature (degC)", tmin)):
+                out += [title, "Year " + " ".join(JAN_DEC)]
+                for i, y in enumerate(years):
+                    out.append(f"{y} " + " ".join(f"{v:5.1f}" for v in data[i]))
+                out.append("")
+        else:
+            raise ValueError(f"Unknown layout {layout!r}; expected 'mm' or 'wide'.")
+        out.append("")
+    return "\n".join(out) + "\n"
+
+
+# ---------------- Self-checks ----------------
+def _check_fixtures() -> Dict[str, str]:
+    """Station files covering both layouts, named and unnamed columns and provisional rows."""
+    mm = synthetic_station_text(n_years=60, layout="mm", seed=1)
+    provisional = mm.rstrip("\n").splitlines()
+    provisional[-3:] = [line + "  Provisional" for line in provisional[-3:]]
+    return {
+        "mm": mm,
+        "wide": synthetic_station_text(n_years=60, layout="wide", seed=2),
+        "provisional": "\n".join(provisional) + "\n",
+        # 'mm' table whose temperature columns are not named tmax/tmin: inferred from the data
+        "unnamed": "\n".join(
+            ["yyyy mm hi lo"] + [" ".join(line.split()[:4]) for line in mm.splitlines() if line.split()[:1] and line.split()[0].isdigit()]
+        ) + "\n",
+        # named columns in a different order, with a leading station id column
+        "named": "\n".join(
+            ["id yyyy mm tmin tmax"] + [f"7 {y} {m} {4 + m % 5}.{m} {12 + m % 7}.{y % 10}" for y in range(1990, 2000) for m in range(1, 13)]
+        ) + "\n",
+    }
+
+
+def check_station_parser(start_year: int = 1900) -> int:
+    """
+    Compare this parser's station frame with the original multi-pass parser
+    (station_parser_legacy.build_tmean_df) on each fixture: same months, same
+    tmax/tmin (at float32 precision) and tmean, same dates. Raises AssertionError
+    on a mismatch; returns the number of fixtures checked.
+    """
+    from station_parser_legacy import build_tmean_df
+
+    fixtures = _check_fixtures()
+    for name, text in fixtures.items():
+        old = build_tmean_df(text, start_year=start_year)
+        new = station_frame(*align_months(parse_station_lines(text.splitlines())), start_year=start_year)
+        assert len(old) == len(new) and len(new), f"{name}: {len(new)} rows vs {len(old)} (original)"
+        for col in ("Year", "Month"):
+            assert np.array_equal(old[col].to_numpy(), new[col].to_numpy()), f"{name}: {col} differs"
+        for col in ("tmax", "tmin"):
+            assert np.array_equal(old[col].to_numpy(np.float32), new[col].to_numpy(), equal_nan=True), f"{name}: {col} differs"
+        assert np.allclose(old["tmean"].to_numpy(), new["tmean"].to_numpy(), atol=1e-5, equal_nan=True), f"{name}: tmean differs"
+        assert np.array_equal(old["Date"].to_numpy(), new["Date"].to_numpy()), f"{name}: Date differs"
+
+    prov = StationParser().feed_lines(fixtures["provisional"].splitlines()).close()
+    assert len(prov.provisional) == 3, f"expected 3 provisional months, got {len(prov.provisional)}"
+    return len(fixtures)
+
+
+if __name__ == "__main__":
+    print(f"station_parser matches the original parser on {check_station_parser()} fixtures")
+
+    # Benchmark against the original (multi-pass) parser on 1x and 100x synthetic files
+    import time
+    from station_parser_legacy import legacy_labeled
+
+    def _old(text: str):
+        return legacy_labeled(text.splitlines())
+
+    def _best(fn, arg, n=3) -> float:
+        best = float("inf")
+        for _ in range(n):
+            t0 = time.perf_counter(); fn(arg); best = min(best, time.perf_counter() - t0)
+        return best
+
+    for layout in ("mm", "wide"):
+        for repeats in (1, 100):
+            text = synthetic_station_text(layout=layout, repeats=repeats)
+            old = _old(text)
+            new = parse_station_lines(text.splitlines())
+            for k in ("tmax", "tmin"):
+                assert np.allclose(old[k]["value"].to_numpy(), new[k][2], equal_nan=True), (layout, k)
+            t_old = _best(_old, text)
+            t_new = _best(lambda s: parse_station_lines(s.splitlines()), text)
+            print(f"{layout:4s} x{repeats:<3d} {len(text) / 1e6:7.2f} MB  original {t_old:7.3f}s  "
+                  f"single-pass {t_new:7.3f}s  ({t_old / t_new:4.1f}x)")
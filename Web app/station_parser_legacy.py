@@ -0,0 +1,258 @@
+# station_parser_legacy.py
+"""
+Reference copy of the original multi-pass station file parser.
+
+The app parses station files with the single-pass `station_parser`; this module keeps
+the parser it replaced (formerly in app.py) unchanged, so the two can be compared
+(`station_parser.check_station_parser`) and benchmarked (benchmarks.py). Nothing in
+the app imports it.
+
+- `_scan_mm_tables` / `_parse_mm_table`: 'mm' long tables, one pandas frame per table
+- `_scan_wide_tables`: `Year JAN .. DEC` tables
+- `legacy_labeled` / `build_tmean_df`: the original labelling and (Year, Month) merge
+"""
+
+from __future__ import annotations
+
+import re
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+YEAR_ROW_RE = re.compile(r"^\s*(\d{4})\b")
+LEADING_NUM_RE = re.compile(r"^(-?\d+(?:\.\d+)?)")
+
+# Header hints for context-based labelling
+TMAX_HINTS = ["tmax", "maximum temperature", "mean maximum", "monthly mean maximum", "mean max"]
+TMIN_HINTS = ["tmin", "minimum temperature", "mean minimum", "monthly mean minimum", "mean min"]
+
+JAN_DEC = ["JAN","FEB","MAR","APR","MAY","JUN","JUL","AUG","SEP","OCT","NOV","DEC"]
+NUM_1_12 = [str(i) for i in range(1,13)]
+
+
+def _token_to_float(tok: str) -> Optional[float]:
+    """
+    Convert a monthly token to float:
+      - '---' or '' -> NaN (keeps month position)
+      - '12.3*' / '12.3E' -> 12.3
+      - 'ANN' / 'Provisional...' / non-numeric -> None (stop row)
+    """
+    t = tok.strip()
+    if not t or t == "---":
+        return float("nan")
+    tl = t.lower()
+    if tl == "ann" or tl.startswith("provisional"):
+        return None
+    m = LEADING_NUM_RE.match(t)
+    if not m:
+        return None
+    try:
+        return float(m.group(1))
+    except ValueError:
+        return None
+
+# ---------- Wide-table detection (Year with 12 month columns) ----------
+def _is_month_header_line(line: str) -> bool:
+    parts = line.strip().split()
+    if not parts: return False
+    if parts[0].lower() != "year": return False
+    cols = [p.upper() for p in parts[1:]]
+    if len(cols) < 12: return False
+    first12 = cols[:12]
+    return (first12 == JAN_DEC) or (first12 == NUM_1_12)
+
+def _scan_wide_tables(lines: List[str]) -> Dict[int, pd.DataFrame]:
+    """Parse 'wide' monthly tables (Year + 12 month columns)."""
+    import pandas as pd
+    tables: Dict[int, pd.DataFrame] = {}
+    i, n = 0, len(lines)
+    while i < n:
+        line = lines[i]
+        if _is_month_header_line(line):
+            rows: List[Tuple[int, int, float]] = []
+            j = i + 1
+            while j < n:
+                L = lines[j].rstrip("\n")
+                if not L.strip(): break
+                if _is_month_header_line(L): break
+                if YEAR_ROW_RE.match(L):
+                    parts = L.split()
+                    try:
+                        year = int(parts[0])
+                    except ValueError:
+                        j += 1; continue
+                    vals: List[float] = []
+                    for tok in parts[1:]:
+                        v = _token_to_float(tok)
+                        if v is None: break
+                        vals.append(v)
+                        if len(vals) == 12: break
+                    if len(vals) == 12:
+                        for m_idx, v in enumerate(vals, start=1):
+                            rows.append((year, m_idx, v))
+                j += 1
+            df = pd.DataFrame(rows, columns=["Year","Month","value"])
+            tables[i] = df
+            i = j; continue
+        i += 1
+    return tables
+
+# ---------- Long-table (row/month) detection: headers with 'mm' ----------
+def _is_mm_header(line: str) -> bool:
+    parts = re.split(r"\s+", line.strip().lower())
+    return ("mm" in parts) and ("year" in parts or "yyyy" in parts or "yr" in parts)
+
+def _parse_mm_table(lines: List[str], hdr_idx: int) -> pd.DataFrame:
+    import pandas as pd
+    header = lines[hdr_idx].strip()
+    header_tokens = re.split(r"\s+", header)
+    cols = [c.strip().lower() for c in header_tokens]
+    col_index = {name: idx for idx, name in enumerate(cols)}
+
+    def _find_col_like(names: List[str]) -> Optional[int]:
+        for nm in names:
+            if nm in col_index:
+                return col_index[nm]
+        return None
+
+    year_col = _find_col_like(["year","yyyy","yr"])
+    mm_col   = _find_col_like(["mm","month"])
+    if year_col is None or mm_col is None:
+        return pd.DataFrame(columns=["Year","Month","value","col"])
+
+    # Named tmax/tmin if present
+    tmax_col = _find_col_like(["tmax","tx","tmax(degc)","tmax(c)","maxtemp","tmax_c"])
+    tmin_col = _find_col_like(["tmin","tn","tmin(degc)","tmin(c)","mintemp","tmin_c"])
+
+    rows_all: List[List[Optional[float]]] = []
+    j = hdr_idx + 1
+    while j < len(lines):
+        L = lines[j].rstrip("\n")
+        if not L.strip(): break
+        if _is_mm_header(L) or _is_month_header_line(L): break
+        parts = re.split(r"\s+", L.strip())
+        if len(parts) <= max(year_col, mm_col):
+            j += 1; continue
+        try:
+            year = int(parts[year_col]); mm = int(parts[mm_col])
+        except Exception:
+            j += 1; continue
+        if not (1 <= mm <= 12):
+            j += 1; continue
+
+        row_float: List[Optional[float]] = [None]*len(parts)
+        for idx, tok in enumerate(parts):
+            if idx in (year_col, mm_col): 
+                continue
+            v = _token_to_float(tok)
+            if v is None:  # stop at ANN/provisional marker
+                break
+            row_float[idx] = v
+        rows_all.append([year, mm, row_float, parts])
+        j += 1
+
+    if not rows_all:
+        return pd.DataFrame(columns=["Year","Month","value","col"])
+
+    def _extract_series(col_idx: int, name: str) -> pd.DataFrame:
+        out = []
+        for year, mm, row_float, _ in rows_all:
+            v = row_float[col_idx] if col_idx < len(row_float) else None
+            if v is None: 
+                continue
+            out.append((int(year), int(mm), float(v), name))
+        return pd.DataFrame(out, columns=["Year","Month","value","col"])
+
+    series_frames = []
+    if tmax_col is not None:
+        series_frames.append(_extract_series(tmax_col, "tmax"))
+    if tmin_col is not None:
+        series_frames.append(_extract_series(tmin_col, "tmin"))
+
+    # If missing, infer two best numeric columns (most complete; higher mean → tmax)
+    if len(series_frames) < 2:
+        col_scores: Dict[int, Tuple[int, float]] = {}
+        for _, _, row_float, _ in rows_all:
+            for idx, val in enumerate(row_float):
+                if val is None: 
+                    continue
+                cnt, s = col_scores.get(idx, (0, 0.0))
+                col_scores[idx] = (cnt+1, s+float(val))
+        if col_scores:
+            cand = sorted(col_scores.items(), key=lambda kv: (-kv[1][0], -kv[1][1]))
+            if len(cand) >= 2:
+                idx1, (c1, s1) = cand[0]; idx2, (c2, s2) = cand[1]
+                mean1, mean2 = s1/max(c1,1), s2/max(c2,1)
+                tmax_idx, tmin_idx = (idx1, idx2) if mean1 >= mean2 else (idx2, idx1)
+                series_frames = [
+                    _extract_series(tmax_idx, "tmax"),
+                    _extract_series(tmin_idx, "tmin"),
+                ]
+
+    if not series_frames:
+        return pd.DataFrame(columns=["Year","Month","value","col"])
+
+    return pd.concat(series_frames, ignore_index=True)
+
+def _scan_mm_tables(lines: List[str]) -> Dict[int, pd.DataFrame]:
+    tables: Dict[int, pd.DataFrame] = {}
+    for i, line in enumerate(lines):
+        if _is_mm_header(line):
+            df = _parse_mm_table(lines, i)
+            if not df.empty:
+                tables[i] = df
+    return tables
+
+def _label_from_wide(lines: List[str]) -> Dict[str, pd.DataFrame]:
+    wide = _scan_wide_tables(lines)
+    if not wide: return {}
+    cands = []
+    for _, df in wide.items():
+        if df.empty: continue
+        cands.append((df["value"].mean(skipna=True), df))
+    if len(cands) < 2: 
+        return {}
+    cands.sort(key=lambda x: x[0])
+    return {"tmin": cands[0][1], "tmax": cands[-1][1]}
+
+def _label_from_mm(lines: List[str]) -> Dict[str, pd.DataFrame]:
+    import pandas as pd
+    mm_tables = _scan_mm_tables(lines)
+    if not mm_tables:
+        return {}
+    combo = pd.concat(mm_tables.values(), ignore_index=True)
+    if "col" not in combo.columns:
+        return {}
+    out: Dict[str, pd.DataFrame] = {}
+    for var in ("tmax","tmin"):
+        dfv = combo.loc[combo["col"] == var, ["Year","Month","value"]].copy()
+        if not dfv.empty:
+            out[var] = dfv
+    return out
+
+def legacy_labeled(lines: List[str]) -> Dict[str, pd.DataFrame]:
+    """tmax/tmin frames: 'mm' tables first, wide tables as the fallback."""
+    labeled = _label_from_mm(lines)
+    if "tmax" not in labeled or "tmin" not in labeled:
+        for k, v in _label_from_wide(lines).items():
+            labeled.setdefault(k, v)
+    return labeled
+
+def build_tmean_df(text: str, start_year: int = 1950) -> pd.DataFrame:
+    """The original `_build_tmean_df`: pandas merge on (Year, Month), float64 columns."""
+    import pandas as pd
+    labeled = legacy_labeled(text.splitlines())
+    if "tmax" not in labeled or "tmin" not in labeled:
+        raise ValueError("Could not obtain both tmax and tmin from file (mm/wide formats).")
+
+    df_tmax = labeled["tmax"].rename(columns={"value": "tmax"})
+    df_tmin = labeled["tmin"].rename(columns={"value": "tmin"})
+    df = pd.merge(df_tmax, df_tmin, on=["Year","Month"], how="inner")
+    df = df.loc[df["Year"] >= int(start_year)].copy()
+    if df.empty:
+        raise ValueError(f"No monthly records at or after start_year={start_year}.")
+
+    df["tmean"] = (df["tmax"] + df["tmin"]) / 2.0
+    df["Date"] = pd.to_datetime(df[["Year","Month"]].assign(DAY=1)) + pd.offsets.MonthEnd(0)
+    return df.sort_values(["Year","Month"]).reset_index(drop=True)
@@ -0,0 +1,306 @@
+# station_store.py
+"""
+Columnar local store of parsed station data, updated month by month.
+
+Each station (keyed by its URL or slug) is a directory of NumPy `.npy` columns:
+Year (int16), Month (int8), tmax, tmin, tmean (float32) and provisional (bool),
+the same dtypes as `station_parser.station_frame`.
+Loading is `np.load(..., mmap_mode="r")`, so a stored station costs a memory map,
+not a download plus a parse.
+
+`update()` takes the latest file text and only parses rows after the last stored
+month. Rows the Met Office marks 'Provisional' are flagged; the next update drops
+everything from the first provisional month onwards and re-parses it, so provisional
+values are replaced once they are final. If the text is byte-identical to the last
+one ingested, nothing is parsed at all.
+
+Columns are written into a new, uniquely named generation directory and `meta.json`
+is switched to it atomically, so readers never see a half-written update; a reader
+that loses a race with the removal of the old generation re-reads `meta.json`.
+Writers of one station are serialised by a thread lock plus a lock file, so
+Streamlit sessions (threads) and separate processes can update the same store.
+
+The store directory defaults to $STATION_STORE_DIR or ~/.cache/apple_tree_app/store.
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional, Tuple, Union
+
+import numpy as np
+
+from perf import PERF
+from station_parser import StationParser, align_months, station_frame
+
+DEFAULT_STORE_DIR = os.environ.get(
+    "STATION_STORE_DIR", str(Path.home() / ".cache" / "apple_tree_app" / "store")
+)
+COLUMNS = {
+    "Year": np.int16,
+    "Month": np.int8,
+    "tmax": np.float32,
+    "tmin": np.float32,
+    "tmean": np.float32,
+    "provisional": np.bool_,
+}
+
+
+LOAD_RETRIES = 5        # re-reads of meta.json when a generation vanishes under a reader
+
+
+def _month_index(years: np.ndarray, months: np.ndarray) -> np.ndarray:
+    return years.astype(np.int32) * 12 + months.astype(np.int32) - 1
+
+
+# ---------------- Writer locks ----------------
+_THREAD_LOCKS: Dict[str, threading.Lock] = {}
+_THREAD_LOCKS_GUARD = threading.Lock()
+
+
+def _thread_lock(path: Path) -> threading.Lock:
+    with _THREAD_LOCKS_GUARD:
+        return _THREAD_LOCKS.setdefault(str(path.resolve()), threading.Lock())
+
+
+@contextmanager
+def _file_lock(path: Path) -> Iterator[None]:
+    """Exclusive lock on `path` across processes (flock on POSIX, msvcrt on Windows)."""
+    with open(path, "a+b") as f:
+        if os.name == "nt":
+            import msvcrt
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:        # LK_LOCK gives up after ~10 s; keep waiting
+                    continue
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class StationStore:
+    def __init__(self, root: str = DEFAULT_STORE_DIR):
+        self.root = Path(root)
+
+    # ---------- layout ----------
+    def _dir(self, station: str) -> Path:
+        s = station.strip()
+        tail = re.sub(r"[^a-z0-9]+", "_", s.lower()).strip("_")[-40:]
+        return self.root / f"{tail}-{hashlib.sha1(s.encode('utf-8')).hexdigest()[:10]}"
+
+    def _meta(self, station: str) -> Dict:
+        try:
+            return json.loads((self._dir(station) / "meta.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    @contextmanager
+    def _writer(self, station: str) -> Iterator[None]:
+        """Hold the station's writer lock (threads of this process, then other processes)."""
+        station_dir = self._dir(station)
+        station_dir.mkdir(parents=True, exist_ok=True)
+        with _thread_lock(station_dir), _file_lock(station_dir / ".lock"):
+            yield
+
+    # ---------- read ----------
+    def load(self, station: str) -> Optional[Dict[str, np.ndarray]]:
+        """Memory-mapped, read-only columns of a stored station (None if not stored)."""
+        meta = self._meta(station)
+        for _ in range(LOAD_RETRIES):
+            if not meta:
+                return None
+            gen_dir = self._dir(station) / meta["generation"]
+            try:
+                return {name: np.load(gen_dir / f"{name}.npy", mmap_mode="r") for name in COLUMNS}
+            except OSError:
+                # A writer may have switched generations and removed this one: follow it
+                latest = self._meta(station)
+                if latest.get("generation") == meta["generation"]:
+                    return None
+                meta = latest
+        return None
+
+    def last_month(self, station: str) -> Optional[Tuple[int, int]]:
+        cols = self.load(station)
+        if cols is None or not len(cols["Year"]):
+            return None
+        return int(cols["Year"][-1]), int(cols["Month"][-1])
+
+    @PERF.timed("store.frame")
+    def frame(self, station: str, start_year: int = 1950):
+        """Stored rows from start_year as a DataFrame shaped like `_build_tmean_df` output."""
+        cols = self.load(station)
+        if cols is None:
+            raise KeyError(f"Station not in store: {station!r}")
+        month_index = _month_index(cols["Year"], cols["Month"])
+        return station_frame(month_index, cols["tmax"], cols["tmin"], start_year=start_year, tmean=cols["tmean"])
+
+    # ---------- write ----------
+    @PERF.timed("store.update")
+    def update(self, station: str, text: Union[str, Iterable[Union[str, bytes]]]) -> int:
+        """
+        Ingest the latest station file (whole text or an iterable of lines).
+        Returns the number of rows appended (including replaced provisional rows).
+        """
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest() if isinstance(text, str) else None
+        with self._writer(station):
+            return self._update(station, text, digest)
+
+    def _update(self, station: str, text: Union[str, Iterable[Union[str, bytes]]], digest: Optional[str]) -> int:
+        meta = self._meta(station)
+        if digest is not None and meta.get("text_sha256") == digest:
+            PERF.count("store.unchanged")
+            return 0
+
+        old = self.load(station)
+        keep, last_idx = 0, None
+        if old is not None and len(old["Year"]):
+            provisional = np.flatnonzero(old["provisional"])
+            keep = int(provisional[0]) if provisional.size else len(old["Year"])
+            if keep:
+                last_idx = int(_month_index(old["Year"][keep - 1:keep], old["Month"][keep - 1:keep])[0])
+
+        parser = StationParser(min_month_index=None if last_idx is None else last_idx + 1)
+        parser.feed_lines(text.splitlines() if isinstance(text, str) else text).close()
+        labeled = parser.labeled()
+        PERF.count("parse.lines_scanned", parser.lines_seen)
+        if "tmax" in labeled and "tmin" in labeled:
+            idx, tmax, tmin = align_months(labeled)
+            if last_idx is not None:
+                newer = idx > last_idx
+                idx, tmax, tmin = idx[newer], tmax[newer], tmin[newer]
+        elif old is None:
+            raise ValueError("Could not obtain both tmax and tmin from file (mm/wide formats).")
+        else:
+            idx = np.empty(0, np.int32); tmax = tmin = np.empty(0, np.float64)
+        tmax, tmin = tmax.astype(np.float32), tmin.astype(np.float32)
+
+        new = {
+            "Year": idx // 12,
+            "Month": idx % 12 + 1,
+            "tmax": tmax,
+            "tmin": tmin,
+            "tmean": (tmax + tmin) / np.float32(2.0),
+            "provisional": np.isin(idx, np.fromiter(parser.provisional, dtype=np.int64)),
+        }
+        cols = {
+            name: np.concatenate([old[name][:keep] if old is not None else np.empty(0, dtype), new[name].astype(dtype)])
+            for name, dtype in COLUMNS.items()
+        }
+        self._write(station, cols, digest)
+        PERF.count("store.rows_appended", len(idx))
+        return len(idx)
+
+    def _write(self, station: str, cols: Dict[str, np.ndarray], digest: Optional[str]) -> None:
+        station_dir = self._dir(station)
+        # Unique per write, so no two writers (or a crashed one) ever share a directory
+        generation = f"g{time.time_ns():x}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        gen_dir = station_dir / generation
+        gen_dir.mkdir(parents=True)
+        for name, arr in cols.items():
+            np.save(gen_dir / f"{name}.npy", arr)
+
+        new_meta = {
+            "station": station,
+            "generation": generation,
+            "rows": int(len(cols["Year"])),
+            "text_sha256": digest,
+            "updated_at": time.time(),
+        }
+        tmp = station_dir / f"meta.json.{generation}.tmp"
+        tmp.write_text(json.dumps(new_meta), encoding="utf-8")
+        os.replace(tmp, station_dir / "meta.json")
+
+        # Older generations may still be memory-mapped (or being opened, see load());
+        # removal is best effort
+        for old_dir in station_dir.glob("g*"):
+            if old_dir.name != generation:
+                shutil.rmtree(old_dir, ignore_errors=True)
+
+
+# ---------------- Self-checks ----------------
+def _check_writer(root: str, text: str, n: int, tag: int) -> None:
+    store = StationStore(root)
+    for i in range(n):
+        # Distinct text each time (same data), so every update writes a new generation
+        store.update("check", text + "\n" * (1 + i * 8 + tag))
+
+
+def check_station_store(n_updates: int = 60) -> None:
+    """
+    Concurrent writers and readers of one station: 2 writer threads with 3 reader
+    threads, then 3 writer processes. Readers must never fail to load the station,
+    and afterwards exactly one generation holds the full data. Raises AssertionError
+    on a failure. Run with `python station_store.py`.
+    """
+    import tempfile
+    import threading
+    from concurrent.futures import ProcessPoolExecutor
+
+    from station_parser import synthetic_station_text
+
+    text = synthetic_station_text(n_years=40, layout="mm")
+    with tempfile.TemporaryDirectory() as root:
+        store = StationStore(root)
+        store.update("check", text)
+        rows = len(store.frame("check", start_year=0))
+
+        errors = []
+        stop = threading.Event()
+
+        def write(tag: int) -> None:
+            try:
+                _check_writer(root, text, n_updates, tag)
+            except Exception as ex:
+                errors.append(f"writer: {ex!r}")
+
+        def read() -> None:
+            while not stop.is_set():
+                try:
+                    if len(store.frame("check", start_year=0)) != rows:
+                        errors.append("reader: wrong row count")
+                except Exception as ex:
+                    errors.append(f"reader: {ex!r}")
+
+        writers = [threading.Thread(target=write, args=(k,)) for k in range(2)]
+        readers = [threading.Thread(target=read) for _ in range(3)]
+        for t in writers + readers:
+            t.start()
+        for t in writers:
+            t.join()
+        stop.set()
+        for t in readers:
+            t.join()
+        assert not errors, f"threads: {errors[:3]} ({len(errors)} errors)"
+
+        with ProcessPoolExecutor(max_workers=3) as pool:
+            for fut in [pool.submit(_check_writer, root, text, n_updates // 3, 2 + k) for k in range(3)]:
+                fut.result()
+
+        generations = [p.name for p in store._dir("check").glob("g*")]
+        assert len(generations) == 1 and generations[0] == store._meta("check")["generation"], generations
+        assert len(store.frame("check", start_year=0)) == rows
+
+
+if __name__ == "__main__":
+    check_station_store()
+    print("station_store: concurrent thread and process writer checks passed")
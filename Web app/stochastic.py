@@ -0,0 +1,215 @@
+# stochastic.py
+"""
+Stochastic per-tree variability and yield distributions.
+
+A `TreeDistribution` wraps a base LifecycleParams with random variation:
+- phase boundaries jittered by a normal draw (rounded to whole years, kept in order)
+- lognormal `plateau_yield` (mean-preserving: the mean stays at the base value)
+- lognormal annual noise on every tree-year (also mean 1)
+- alternate bearing: yield x (1 + a) and (1 - a) in alternating years, random phase per tree
+
+Trees are sampled in chunks with NumPy Generators. The seed is split with
+`SeedSequence.spawn`, one child per chunk, and chunk boundaries depend only on
+`chunk_size`, so the result is bit-identical however many worker processes run it.
+Each chunk is reduced to a per-year histogram of integer counts (plus float sums
+merged in chunk order), so memory stays at chunk_size x n_years no matter how many
+trees are simulated. Quantiles (default P5/P50/P95) are read from the merged histogram.
+
+Example:
+    dist = TreeDistribution(boundary_sd=3, plateau_sigma=0.2, annual_sigma=0.15, alternate_bearing=0.2)
+    q = yield_quantiles(dist, n_trees=200_000, seed=42)
+    q.to_pandas()   # Year, mean, P5, P50, P95
+"""
+
+import itertools
+import math
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, Optional, Sequence, Tuple
+
+import numpy as np
+
+from apple_tree_sim import LifecycleParams, _yield_curve_arrays
+from sweep import BOUNDARY_FIELDS, iter_bounded, worker_count
+
+
+@dataclass(frozen=True)
+class TreeDistribution:
+    base: LifecycleParams = field(default_factory=LifecycleParams)
+    boundary_sd: float = 0.0          # years, std dev of each phase boundary
+    plateau_sigma: float = 0.0        # lognormal sigma of plateau_yield
+    annual_sigma: float = 0.0         # lognormal sigma of year-to-year noise
+    alternate_bearing: float = 0.0    # on/off year amplitude a in [0, 1)
+
+    def horizon(self) -> int:
+        """Years needed to cover almost every sampled tree (end_year + 4 sd)."""
+        return self.base.end_year + math.ceil(4 * self.boundary_sd) + 1
+
+    def upper_bound(self) -> float:
+        """Yield above which tree-years are rare (base plateau at +4 sigma, both lognormals)."""
+        return self.base.plateau_yield * math.exp(4 * (self.plateau_sigma + self.annual_sigma)) * (1 + self.alternate_bearing)
+
+    def sample(self, n: int, rng: np.random.Generator) -> Dict[str, np.ndarray]:
+        """Draw n trees: one float64 array per LifecycleParams field."""
+        b = self.base
+        cols: Dict[str, np.ndarray] = {}
+        for name in BOUNDARY_FIELDS:
+            value = np.full(n, float(getattr(b, name)))
+            if self.boundary_sd > 0:
+                value += np.rint(rng.normal(0.0, self.boundary_sd, n))
+            cols[name] = value
+        # Keep 1 <= juvenile <= exp_start < plateau_start < decline_start < end
+        cols["juvenile_years"] = np.maximum(cols["juvenile_years"], 1.0)
+        cols["exp_start_year"] = np.maximum(cols["exp_start_year"], cols["juvenile_years"])
+        for prev, name in zip(BOUNDARY_FIELDS[1:], BOUNDARY_FIELDS[2:]):
+            cols[name] = np.maximum(cols[name], cols[prev] + 1.0)
+
+        plateau = np.full(n, float(b.plateau_yield))
+        if self.plateau_sigma > 0:
+            s = self.plateau_sigma
+            plateau *= rng.lognormal(-0.5 * s * s, s, n)
+        cols["plateau_yield"] = plateau
+        cols["slow_max_fraction"] = np.full(n, float(b.slow_max_fraction))
+        cols["decline_fraction"] = np.full(n, float(b.decline_fraction))
+        return cols
+
+    def yields(self, n: int, n_years: int, rng: np.random.Generator) -> np.ndarray:
+        """(n, n_years) float64 yields of n sampled trees at ages 0..n_years-1."""
+        cols = self.sample(n, rng)
+        ages = np.arange(n_years, dtype=np.float64)[None, :]
+        out = _yield_curve_arrays(ages, *(cols[f][:, None] for f in (
+            "juvenile_years", "exp_start_year", "plateau_start_year", "decline_start_year",
+            "end_year", "plateau_yield", "slow_max_fraction", "decline_fraction",
+        )))
+        if self.annual_sigma > 0:
+            s = self.annual_sigma
+            out *= rng.lognormal(-0.5 * s * s, s, out.shape)
+        if self.alternate_bearing > 0:
+            phase = rng.integers(0, 2, n)[:, None]
+            sign = 1.0 - 2.0 * ((np.arange(n_years)[None, :] + phase) & 1)
+            out *= 1.0 + self.alternate_bearing * sign
+        return out
+
+
+# ---------------- Streaming histogram ----------------
+@dataclass
+class YieldQuantiles:
+    ages: np.ndarray              # (Y,) tree age in years
+    quantiles: Tuple[float, ...]
+    values: np.ndarray            # (Q, Y) yield at each quantile
+    mean: np.ndarray              # (Y,)
+    n_trees: int
+    overflow: int                 # tree-years above the histogram range (counted in the top bin)
+
+    def to_pandas(self):
+        import pandas as pd
+        df = pd.DataFrame({"Year": self.ages, "mean": self.mean})
+        for q, v in zip(self.quantiles, self.values):
+            df[f"P{q * 100:g}"] = v
+        return df
+
+
+def _histogram(values: np.ndarray, upper: float, bins: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Per-column counts of an (n, Y) block: bin 0 holds exact zeros (trees not yet planted
+    or removed), bins 1..bins split (0, upper] evenly, and larger values land in the last bin.
+    Returns (counts (Y, bins + 1) int64, column sums float64).
+    """
+    n, n_years = values.shape
+    idx = np.where(values > 0, np.minimum(np.ceil(values * (bins / upper)), bins), 0).astype(np.int64)
+    flat = idx + np.arange(n_years, dtype=np.int64)[None, :] * (bins + 1)
+    counts = np.bincount(flat.ravel(), minlength=n_years * (bins + 1)).reshape(n_years, bins + 1)
+    return counts, values.sum(axis=0)
+
+
+def _chunk_histogram(dist: TreeDistribution, n: int, n_years: int, seed: np.random.SeedSequence,
+                     upper: float, bins: int) -> Tuple[np.ndarray, np.ndarray, int]:
+    values = dist.yields(n, n_years, np.random.default_rng(seed))
+    counts, sums = _histogram(values, upper, bins)
+    return counts, sums, int((values > upper).sum())
+
+
+def _quantiles_from_counts(counts: np.ndarray, upper: float, qs: Sequence[float]) -> np.ndarray:
+    """Linear interpolation inside the bin holding each quantile; the zero bin maps to 0."""
+    n_years, nb = counts.shape
+    bins = nb - 1
+    width = upper / bins
+    cum = np.cumsum(counts, axis=1)
+    total = cum[:, -1]
+    out = np.empty((len(qs), n_years))
+    rows = np.arange(n_years)
+    for i, q in enumerate(qs):
+        target = q * total
+        k = np.minimum((cum < target[:, None]).sum(axis=1), bins)
+        below = np.where(k > 0, cum[rows, np.maximum(k - 1, 0)], 0)
+        inside = counts[rows, k]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            frac = np.clip(np.where(inside > 0, (target - below) / inside, 0.0), 0.0, 1.0)
+        out[i] = np.where(k == 0, 0.0, (k - 1 + frac) * width)
+    return out
+
+
+def _chunk_sizes(n_trees: int, chunk_size: int) -> Iterator[int]:
+    full, rest = divmod(n_trees, chunk_size)
+    yield from itertools.repeat(chunk_size, full)
+    if rest:
+        yield rest
+
+
+def yield_quantiles(
+    dist: TreeDistribution,
+    n_trees: int,
+    n_years: Optional[int] = None,
+    seed: Optional[int] = None,
+    quantiles: Sequence[float] = (0.05, 0.5, 0.95),
+    chunk_size: int = 20_000,
+    max_workers: Optional[int] = 1,
+    bins: int = 2048,
+) -> YieldQuantiles:
+    """
+    Simulate n_trees sampled from `dist` and summarise yield per year of age.
+
+    Chunks of `chunk_size` trees get their own child SeedSequence, so for a given seed
+    and chunk_size the output is identical for any max_workers (None = all CPUs).
+    Quantiles are accurate to upper_bound() / bins.
+    """
+    n_years = dist.horizon() if n_years is None else n_years
+    upper = dist.upper_bound() or 1.0
+    sizes = list(_chunk_sizes(n_trees, chunk_size))
+    jobs = list(zip(sizes, np.random.SeedSequence(seed).spawn(len(sizes))))
+    max_workers = worker_count(max_workers)
+
+    counts = np.zeros((n_years, bins + 1), dtype=np.int64)
+    sums = np.zeros(n_years)
+    overflow = 0
+
+    def merge(part):
+        nonlocal overflow
+        np.add(counts, part[0], out=counts)
+        np.add(sums, part[1], out=sums)
+        overflow += part[2]
+
+    if max_workers == 1:
+        for n, ss in jobs:
+            merge(_chunk_histogram(dist, n, n_years, ss, upper, bins))
+    else:
+        # Sums are folded in chunk order (float addition is not associative)
+        done_parts: Dict[int, Tuple] = {}
+        next_i = 0
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            calls = ((i, (dist, n, n_years, ss, upper, bins)) for i, (n, ss) in enumerate(jobs))
+            for i, fut in iter_bounded(pool, _chunk_histogram, calls, max_workers):
+                done_parts[i] = fut.result()
+                while next_i in done_parts:
+                    merge(done_parts.pop(next_i))
+                    next_i += 1
+
+    qs = tuple(float(q) for q in quantiles)
+    return YieldQuantiles(
+        ages=np.arange(n_years),
+        quantiles=qs,
+        values=_quantiles_from_counts(counts, upper, qs),
+        mean=sums / max(n_trees, 1),
+        n_trees=n_trees,
+        overflow=overflow,
+    )
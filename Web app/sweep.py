@@ -0,0 +1,183 @@
+# sweep.py
+"""
+Parameter sweeps / Monte Carlo runs over LifecycleParams.
+
+Scenarios come from a grid (`param_grid`) or a sampled distribution (`sample_params`),
+are split into chunks and evaluated across a ProcessPoolExecutor. Each worker turns a
+chunk into the summary metrics the app shows (peak, total, productive years) with
+the closed-form `lifecycle_summary`, so no per-year history is ever built.
+
+Example:
+    grid = param_grid(plateau_yield=[80, 100, 120], end_year=[90, 100, 110])
+    for r in run_sweep(grid):
+        print(r.index, r.peak_yield, r.total_yield, r.productive_years)
+"""
+
+import itertools
+import os
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass, fields, replace
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from apple_tree_sim import LifecycleParams, lifecycle_summary
+
+PARAM_FIELDS = tuple(f.name for f in fields(LifecycleParams))
+INT_FIELDS = {f.name for f in fields(LifecycleParams) if f.type in (int, "int")}
+BOUNDARY_FIELDS = ("juvenile_years", "exp_start_year", "plateau_start_year", "decline_start_year", "end_year")
+MAX_REJECTED_DRAWS = 1_000_000  # sample_params gives up after this many rejections in a row
+
+
+@dataclass
+class SweepResult:
+    index: int                  # position of the scenario in the input stream
+    params: LifecycleParams
+    peak_yield: float
+    total_yield: float
+    productive_years: int
+
+
+def param_grid(base: Optional[LifecycleParams] = None, **axes: Sequence) -> Iterator[LifecycleParams]:
+    """Cartesian product of the given field values, applied on top of `base`."""
+    base = base or LifecycleParams()
+    names = list(axes)
+    for combo in itertools.product(*(axes[n] for n in names)):
+        yield replace(base, **dict(zip(names, combo)))
+
+
+def sample_params(
+    n: int,
+    ranges: Dict[str, Tuple[float, float]],
+    base: Optional[LifecycleParams] = None,
+    seed: Optional[int] = None,
+) -> Iterator[LifecycleParams]:
+    """
+    Draw n scenarios with each named field uniform in [low, high] (integer fields are
+    rounded). Scenarios whose phase boundaries end up out of order are redrawn.
+
+    Raises ValueError if the ranges (with `base` for the other fields) cannot give
+    ordered boundaries, or if too few draws are accepted to finish.
+    """
+    base = base or LifecycleParams()
+    _check_orderable(ranges, base)
+    rng = np.random.default_rng(seed)
+    produced = 0
+    rejected = 0
+    while produced < n:
+        # Draw in blocks so the RNG is called once per field, not once per scenario
+        block = min(max(n - produced, 1), 4096)
+        draws = {name: rng.uniform(lo, hi, size=block) for name, (lo, hi) in ranges.items()}
+        for name in INT_FIELDS & draws.keys():
+            draws[name] = np.rint(draws[name]).astype(int)
+        cols = {f.name: draws[f.name].tolist() if f.name in draws else [getattr(base, f.name)] * block
+                for f in fields(LifecycleParams)}
+        for values in zip(*cols.values()):
+            p = LifecycleParams(*values)
+            if 0 < p.juvenile_years <= p.exp_start_year < p.plateau_start_year < p.decline_start_year < p.end_year:
+                produced += 1
+                rejected = 0
+                yield p
+                if produced == n:
+                    return
+            else:
+                rejected += 1
+        if rejected >= MAX_REJECTED_DRAWS:
+            raise ValueError(f"sample_params: {rejected} draws in a row had out-of-order phase "
+                             f"boundaries; widen or shift `ranges`.")
+
+
+def _check_orderable(ranges: Dict[str, Tuple[float, float]], base: LifecycleParams) -> None:
+    """Raise ValueError unless some draw can give 0 < juvenile <= exp < plateau < decline < end."""
+    unknown = set(ranges) - set(PARAM_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown LifecycleParams fields in ranges: {sorted(unknown)}")
+    # Smallest value each boundary can take while staying above the previous one
+    lowest = 0.0
+    for i, name in enumerate(BOUNDARY_FIELDS):
+        lo, hi = ranges.get(name, (getattr(base, name),) * 2)
+        lo, hi = (float(np.rint(lo)), float(np.rint(hi))) if name in INT_FIELDS else (lo, hi)
+        need = lowest if name == "exp_start_year" else lowest + 1
+        value = max(min(lo, hi), need)
+        if value > max(lo, hi):
+            raise ValueError(f"sample_params: {name} in [{lo:g}, {hi:g}] cannot exceed the earlier "
+                             f"phase boundaries (needs >= {need:g}); ranges: {ranges}")
+        lowest = value
+
+
+# ---------------- Process pool helpers ----------------
+def worker_count(max_workers: Optional[int]) -> int:
+    """max_workers, or every CPU when it is None (or 0)."""
+    return max_workers or os.cpu_count() or 1
+
+
+def iter_bounded(
+    pool: Executor,
+    fn: Callable,
+    items: Iterable[Tuple[Any, Tuple]],
+    max_workers: int,
+) -> Iterator[Tuple[Any, Future]]:
+    """
+    Submit fn(*args) for each (key, args) of `items`, keeping about two calls per worker
+    in flight, and yield (key, finished future) in completion order. `items` is pulled
+    lazily, so it can be a generator of any length; memory is bounded by what is in flight.
+    """
+    items = iter(items)
+    pending: Dict[Future, Any] = {}
+    for key, args in itertools.islice(items, 2 * max_workers):
+        pending[pool.submit(fn, *args)] = key
+    while pending:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for fut in done:
+            yield pending.pop(fut), fut
+            nxt = next(items, None)
+            if nxt is not None:
+                pending[pool.submit(fn, *nxt[1])] = nxt[0]
+
+
+def _chunk_metrics(params: List[LifecycleParams]) -> np.ndarray:
+    """(n, 3) array of peak, total and productive years for a chunk of scenarios."""
+    s = lifecycle_summary(params)
+    return np.column_stack([s.peak_yield, s.total_yield, s.productive_years])
+
+
+def _chunks(items: Iterable[LifecycleParams], size: int) -> Iterator[Tuple[int, List[LifecycleParams]]]:
+    it = iter(items)
+    start = 0
+    while True:
+        chunk = list(itertools.islice(it, size))
+        if not chunk:
+            return
+        yield start, chunk
+        start += len(chunk)
+
+
+def _to_results(start: int, chunk: List[LifecycleParams], metrics: np.ndarray) -> Iterator[SweepResult]:
+    for i, (p, (peak, total, productive)) in enumerate(zip(chunk, metrics)):
+        yield SweepResult(start + i, p, float(peak), float(total), int(productive))
+
+
+def run_sweep(
+    scenarios: Iterable[LifecycleParams],
+    chunk_size: int = 2000,
+    max_workers: Optional[int] = None,
+) -> Iterator[SweepResult]:
+    """
+    Evaluate scenarios in parallel and yield a SweepResult per scenario as chunks finish.
+
+    Results arrive in completion order (use `SweepResult.index` to restore input order).
+    Only about two chunks per worker are in flight at once, so `scenarios` can be a lazy
+    generator of any length. max_workers=1 runs in-process without a pool.
+    """
+    max_workers = worker_count(max_workers)
+    chunks = _chunks(scenarios, chunk_size)
+
+    if max_workers == 1:
+        for start, chunk in chunks:
+            yield from _to_results(start, chunk, _chunk_metrics(chunk))
+        return
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        jobs = (((start, chunk), (chunk,)) for start, chunk in chunks)
+        for (start, chunk), fut in iter_bounded(pool, _chunk_metrics, jobs, max_workers):
+            yield from _to_results(start, chunk, fut.result())